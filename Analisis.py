@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+import numpy as np
+from RegistroResultados import SUFIJO_PARCIAL
+
+def cargar_corrida(ruta, columnas=None):
+    """
+    Carga una corrida guardada por RegistroResultados. Devuelve (meta, datos),
+    donde `datos` es un dict {columna: np.ndarray} con los bloques concatenados.
+
+    El .npz se lee de forma perezosa: sólo se descomprimen los miembros de las
+    `columnas` pedidas (todas si es None). Los miembros comprimidos no admiten
+    memory-mapping, pero así cargar cientos de corridas sólo lee lo necesario.
+
+    `ruta` también puede ser el directorio `<ruta>.parcial` de una corrida que
+    se cortó antes de consolidarse (se lee con los bloques completos), o un
+    .npz que no llegó a existir pero cuyo directorio parcial sí.
+    """
+    if not os.path.isdir(ruta) and not os.path.exists(ruta) and os.path.isdir(ruta + SUFIJO_PARCIAL):
+        ruta = ruta + SUFIJO_PARCIAL
+    if os.path.isdir(ruta):
+        return _cargar_corrida_parcial(ruta, columnas)
+
+    with np.load(ruta, allow_pickle=False) as archivo:
+        nombre_meta = "meta_final" if "meta_final" in archivo.files else "meta"
+        meta = json.loads(str(archivo[nombre_meta]))
+        bloques = defaultdict(list)
+        for nombre in sorted(archivo.files):
+            columna, _, bloque = nombre.rpartition(".")
+            if not bloque.isdigit() or (columnas is not None and columna not in columnas):
+                continue
+            bloques[columna].append(archivo[nombre])
+    datos = {columna: np.concatenate(partes) for columna, partes in bloques.items()}
+    return meta, datos
+
+def _cargar_corrida_parcial(directorio, columnas):
+    with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as archivo:
+        meta = json.load(archivo)
+    bloques = defaultdict(list)
+    for nombre in sorted(os.listdir(directorio)):
+        if not (nombre.startswith("bloque.") and nombre.endswith(".npz")):
+            continue
+        with np.load(os.path.join(directorio, nombre), allow_pickle=False) as archivo:
+            for columna in archivo.files:
+                if columnas is None or columna in columnas:
+                    bloques[columna].append(archivo[columna])
+    datos = {columna: np.concatenate(partes) for columna, partes in bloques.items()}
+    return meta, datos
+
+def resumen_corrida(meta, datos, banda_s=0.4, clase=None):
+    """
+    Estadísticas de una corrida: percentiles de latencia por petición,
+    cumplimiento de SLO, instancias promedio y pico, instancias-segundo y,
+    si la corrida guardó su contabilidad de costo, utilización y churn.
+    """
+    latencias = datos.get("req_latencia", np.empty(0))
+    if clase is not None and latencias.size:
+        latencias = latencias[datos["req_clase"] == meta["clases"].index(clase)]
+    umbral = meta.get("latencia_deseada_s", 1.0) + banda_s
+
+    t = datos.get("t", np.empty(0))
+    instancias = datos.get("instancias", np.empty(0))
+    # Integral por tramos constantes (la serie de instancias es escalonada).
+    instancias_segundo = float(np.sum(instancias[:-1] * np.diff(t))) if t.size > 1 else 0.0
+    duracion = float(t[-1] - t[0]) if t.size > 1 else 0.0
+
+    if latencias.size:
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        slo = float(np.mean(latencias <= umbral) * 100.0)
+    else:
+        p50 = p95 = p99 = slo = float("nan")
+
+    costo = _costo_del_tramo(meta)
+    return {
+        "peticiones": int(latencias.size),
+        "latencia_p50_s": float(p50),
+        "latencia_p95_s": float(p95),
+        "latencia_p99_s": float(p99),
+        "slo_pct": slo,
+        "instancias_promedio": instancias_segundo / duracion if duracion else float("nan"),
+        "instancias_pico": int(instancias.max()) if instancias.size else 0,
+        "instancias_segundo": instancias_segundo,
+        "utilizacion_pct": costo.get("utilizacion_pct", float("nan")),
+        "lotes_escalado": costo.get("lotes_escalado", float("nan")),
+        "reversiones_escalado": costo.get("reversiones", float("nan")),
+        "fallas_instancias": costo.get("fallas", float("nan")),
+    }
+
+def _costo_del_tramo(meta):
+    """
+    Costo de la corrida descontando los acumulados al empezar a registrar
+    (los que trae un snapshot restaurado).
+    """
+    final = meta.get("resumen", {}).get("costo", {})
+    inicial = meta.get("costo_al_inicio", {})
+    if not final:
+        return {}
+    tramo = {clave: final[clave] - inicial.get(clave, 0)
+             for clave in ("instancia_segundos", "segundos_ocupados", "lotes_escalado", "reversiones", "fallas")
+             if clave in final}
+    tramo["utilizacion_pct"] = (100.0 * tramo["segundos_ocupados"] / tramo["instancia_segundos"]
+                                if tramo.get("instancia_segundos") else float("nan"))
+    return tramo
+
+def comparar(resumenes):
+    """
+    Agrega los resúmenes de muchas corridas de forma vectorizada: para cada
+    métrica devuelve (media, desvío estándar, mínimo, máximo).
+    """
+    metricas = list(resumenes[0].keys())
+    tabla = np.array([[r[m] for m in metricas] for r in resumenes], dtype=np.float64)
+    return {
+        metrica: (media, desvio, minimo, maximo)
+        for metrica, media, desvio, minimo, maximo in zip(
+            metricas,
+            np.nanmean(tabla, axis=0),
+            np.nanstd(tabla, axis=0),
+            np.nanmin(tabla, axis=0),
+            np.nanmax(tabla, axis=0),
+        )
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis comparativo de corridas guardadas (.npz).")
+    parser.add_argument("corridas", nargs="+", help="Archivos .npz generados por main.py.")
+    parser.add_argument("--banda", type=float, default=0.4,
+                        help="Banda de SLO (s) por encima del setpoint. Por defecto 0.4.")
+    parser.add_argument("--clase", default=None, help="Limita el análisis a una clase de petición.")
+    parser.add_argument("--agrupar", default=None, metavar="CLAVE",
+                        help="Agrupa las corridas por una clave de meta (ej. Kd) y compara grupos.")
+    args = parser.parse_args(argv)
+
+    columnas = {"t", "instancias", "req_latencia", "req_clase"}
+    grupos = defaultdict(list)
+    for ruta in args.corridas:
+        meta, datos = cargar_corrida(ruta, columnas)
+        resumen = resumen_corrida(meta, datos, banda_s=args.banda, clase=args.clase)
+        grupos[meta.get(args.agrupar) if args.agrupar else "todas"].append(resumen)
+        if len(args.corridas) <= 20:
+            print(f"{ruta}: " + ", ".join(f"{k}={v:.3f}" for k, v in resumen.items()))
+
+    for grupo, resumenes in grupos.items():
+        print(f"\n== {args.agrupar or 'grupo'}={grupo} ({len(resumenes)} corridas) ==")
+        for metrica, (media, desvio, minimo, maximo) in comparar(resumenes).items():
+            print(f"  {metrica:22s} media={media:10.3f}  desvio={desvio:9.3f}  min={minimo:10.3f}  max={maximo:10.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
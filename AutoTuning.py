@@ -0,0 +1,134 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from MonteCarlo import simular_lote, costo, ESCENARIO_POR_DEFECTO
+
+# Parámetros que se ajustan y sus límites de búsqueda.
+PARAMETROS = ("Kp", "Kd", "deadband_s", "frecuencia_muestreo_hz")
+LIMITES = {
+    "Kp": (0.0, 5.0),
+    "Kd": (0.0, 20.0),
+    "deadband_s": (0.0, 0.5),
+    "frecuencia_muestreo_hz": (1.0, 100.0),
+}
+
+def evaluar(candidatos, semillas, semilla, escenario=None, peso_instancias=0.01, dt_s=0.01):
+    """
+    Evalúa todos los candidatos (array de forma (n, len(PARAMETROS))) en un
+    único lote de MonteCarlo.simular_lote con `semillas` corridas cada uno.
+    Devuelve (costo_medio, slo_medio, instancias_segundo_medio), arrays de largo n.
+    """
+    n = len(candidatos)
+    columna = {nombre: np.repeat(candidatos[:, i], semillas) for i, nombre in enumerate(PARAMETROS)}
+    resultados = simular_lote(
+        n * semillas,
+        columna["Kp"], columna["Kd"], columna["deadband_s"],
+        1.0 / columna["frecuencia_muestreo_hz"],
+        escenario=escenario, semilla=semilla, dt_s=dt_s,
+    )
+    costos = costo(resultados["slo_pct"], resultados["instancias_segundo"], peso_instancias)
+    return (
+        costos.reshape(n, semillas).mean(axis=1),
+        resultados["slo_pct"].reshape(n, semillas).mean(axis=1),
+        resultados["instancias_segundo"].reshape(n, semillas).mean(axis=1),
+    )
+
+def ajustar(inicial, generaciones=15, poblacion=24, semillas=32, elite=6,
+            escenario=None, peso_instancias=0.01, semilla=0, dt_s=0.01):
+    """
+    Ajusta las ganancias con el método de entropía cruzada (una estrategia
+    evolutiva con distribución gaussiana diagonal, de la familia de CMA-ES).
+
+    En cada generación todos los candidatos se evalúan primero con pocas
+    semillas y sólo la mitad más prometedora pasa a la evaluación completa
+    (parada temprana de los candidatos claramente malos). Todas las
+    evaluaciones de una etapa corren vectorizadas en un solo lote.
+
+    Cada generación usa semillas distintas, así que sus costos no son
+    comparables entre sí: el mejor de cada generación pasa a una final en la
+    que todos se reevalúan con las mismas semillas, nuevas (las llegadas no
+    dependen del controlador, así que enfrentan exactamente la misma carga).
+
+    :param inicial: dict con los valores iniciales de PARAMETROS.
+    :return: dict con la mejor configuración encontrada y sus métricas.
+    """
+    rng = np.random.default_rng(semilla)
+    bajo = np.array([LIMITES[p][0] for p in PARAMETROS])
+    alto = np.array([LIMITES[p][1] for p in PARAMETROS])
+    media = np.array([inicial[p] for p in PARAMETROS], dtype=np.float64)
+    desvio = (alto - bajo) / 4.0
+    semillas_preliminares = max(2, semillas // 4)
+    finalistas = []
+
+    for generacion in range(generaciones):
+        candidatos = np.clip(rng.normal(media, desvio, size=(poblacion, len(PARAMETROS))), bajo, alto)
+        candidatos[0] = media  # la media actual siempre compite
+        semilla_gen = semilla + generacion
+
+        # Etapa 1: evaluación barata, descartamos la mitad peor.
+        costos_prelim, _, _ = evaluar(candidatos, semillas_preliminares, semilla_gen,
+                                      escenario, peso_instancias, dt_s)
+        sobrevivientes = candidatos[np.argsort(costos_prelim)[:max(elite, poblacion // 2)]]
+
+        # Etapa 2: evaluación completa de los sobrevivientes.
+        costos, slo, inst_seg = evaluar(sobrevivientes, semillas, semilla_gen,
+                                        escenario, peso_instancias, dt_s)
+        orden = np.argsort(costos)
+        elites = sobrevivientes[orden[:elite]]
+
+        finalistas.append(sobrevivientes[orden[0]])
+
+        # Actualización suavizada de la distribución de búsqueda.
+        media = 0.7 * elites.mean(axis=0) + 0.3 * media
+        desvio = np.maximum(0.7 * elites.std(axis=0) + 0.3 * desvio, (alto - bajo) * 1e-3)
+        logging.info("Generacion %d/%d: mejor costo=%.3f (Kp=%.3f, Kd=%.3f, deadband=%.3fs, muestreo=%.1f Hz)",
+                     generacion + 1, generaciones, costos[orden[0]], *finalistas[-1])
+
+    # Final: todos los finalistas (y la media final) con las mismas semillas.
+    finalistas.append(media)
+    semilla_final = semilla + generaciones
+    mejor = None
+    for finalista in finalistas:
+        costo_f, slo_f, inst_seg_f = evaluar(finalista[np.newaxis], semillas, semilla_final,
+                                             escenario, peso_instancias, dt_s)
+        if mejor is None or costo_f[0] < mejor["costo"]:
+            mejor = dict(zip(PARAMETROS, (float(v) for v in finalista)))
+            mejor.update(costo=float(costo_f[0]), slo_pct=float(slo_f[0]),
+                         instancias_segundo=float(inst_seg_f[0]))
+    logging.info("Final entre %d finalistas: costo=%.3f (Kp=%.3f, Kd=%.3f, deadband=%.3fs, muestreo=%.1f Hz)",
+                 len(finalistas), mejor["costo"], *(mejor[p] for p in PARAMETROS))
+    return mejor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ajuste automático de ganancias del controlador sobre simulaciones aceleradas.")
+    parser.add_argument("--salida", default="controlador_ajustado.json",
+                        help="Archivo JSON de configuración a generar (se carga con main.py --config).")
+    parser.add_argument("--generaciones", type=int, default=15)
+    parser.add_argument("--poblacion", type=int, default=24)
+    parser.add_argument("--semillas", type=int, default=32, help="Corridas por candidato en la evaluación completa.")
+    parser.add_argument("--peso-instancias", type=float, default=0.01,
+                        help="Peso del costo por instancia-segundo frente al %% de violación de SLO.")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--dt", type=float, default=0.01, help="Paso de integración (s simulados).")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Partimos de la configuración actual de main.py.
+    inicial = {"Kp": 0.8, "Kd": 7.0, "deadband_s": 0.0, "frecuencia_muestreo_hz": 50.0}
+    inicio = time.perf_counter()
+    mejor = ajustar(inicial, generaciones=args.generaciones, poblacion=args.poblacion,
+                    semillas=args.semillas, peso_instancias=args.peso_instancias,
+                    semilla=args.semilla, dt_s=args.dt)
+    mejor["escenario"] = ESCENARIO_POR_DEFECTO
+    mejor["peso_instancias"] = args.peso_instancias
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(mejor, archivo, indent=2)
+    print(f"Configuracion ajustada guardada en {args.salida} ({time.perf_counter() - inicio:.1f}s).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import os
+import zlib
+import pickle
+import random
+import logging
+import threading
+
+VERSION_SNAPSHOT = 1
+
+def exportar_snapshot(manager, controlador, medidor, data_collector, cliente):
+    """
+    Reúne el estado completo de la simulación en un dict: tiempo simulado,
+    estado del RNG y el estado exportado por cada componente.
+
+    El manager y el DataCollector se exportan en un mismo corte
+    (`manager.corte_lock`): una petición que termina entretanto queda o bien
+    en curso o bien resuelta, nunca en ambos ni en ninguno.
+    """
+    with manager.corte_lock:
+        t_sim = manager.reloj.time() - data_collector.start_time
+        estado_manager = manager.exportar_estado()
+        estado_data_collector = data_collector.exportar_estado()
+    return {
+        "version": VERSION_SNAPSHOT,
+        "t_sim": t_sim,
+        "random": random.getstate(),
+        "manager": estado_manager,
+        "controlador": controlador.exportar_estado(),
+        "medidor": medidor.exportar_estado(),
+        "data_collector": estado_data_collector,
+        "cliente": cliente.exportar_estado(),
+    }
+
+def guardar_snapshot(ruta, manager, controlador, medidor, data_collector, cliente):
+    """
+    Guarda el estado de la simulación en `ruta` como pickle comprimido con zlib.
+    La escritura es atómica (archivo temporal + rename) para que un corte a mitad
+    de camino no deje un snapshot corrupto.
+    """
+    estado = exportar_snapshot(manager, controlador, medidor, data_collector, cliente)
+    datos = zlib.compress(pickle.dumps(estado, protocol=pickle.HIGHEST_PROTOCOL))
+    ruta_temporal = f"{ruta}.tmp"
+    with open(ruta_temporal, "wb") as archivo:
+        archivo.write(datos)
+    os.replace(ruta_temporal, ruta)
+    logging.info("Checkpoint: snapshot guardado en %s (t=%.1fs, %d bytes).",
+                 ruta, estado["t_sim"], len(datos))
+    return estado
+
+def cargar_snapshot(ruta):
+    """Lee un snapshot guardado con `guardar_snapshot`."""
+    with open(ruta, "rb") as archivo:
+        estado = pickle.loads(zlib.decompress(archivo.read()))
+    if estado.get("version") != VERSION_SNAPSHOT:
+        raise ValueError(f"Version de snapshot no soportada: {estado.get('version')}")
+    return estado
+
+def restaurar_snapshot(estado, manager, controlador, medidor, data_collector, cliente):
+    """
+    Aplica un snapshot sobre componentes recién creados. Los componentes deben
+    haberse construido con `sim_start_time = reloj.time() - estado["t_sim"]` para
+    que los tiempos de llegada guardados sigan siendo coherentes.
+    """
+    random.setstate(estado["random"])
+    data_collector.restaurar_estado(estado["data_collector"])
+    controlador.restaurar_estado(estado["controlador"])
+    medidor.restaurar_estado(estado["medidor"])
+    cliente.restaurar_estado(estado["cliente"])
+    manager.restaurar_estado(estado["manager"])
+    logging.info("Checkpoint: simulacion restaurada en t=%.1fs.", estado["t_sim"])
+
+class GuardadoPeriodico:
+    """
+    Guarda un snapshot cada `intervalo_s` segundos simulados, para poder
+    retomar la simulación aunque el proceso termine de forma abrupta.
+    """
+
+    def __init__(self, ruta, intervalo_s, manager, controlador, medidor, data_collector, cliente):
+        self.ruta = ruta
+        self.intervalo_s = intervalo_s
+        self._componentes = (manager, controlador, medidor, data_collector, cliente)
+        self.reloj = manager.reloj
+        self._detener = threading.Event()
+        self._thread = threading.Thread(target=self._bucle_guardado, name="Checkpoint", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+
+    def detener(self):
+        self._detener.set()
+        self._thread.join()
+
+    def _bucle_guardado(self):
+        # Event.wait con timeout permite interrumpir la espera al detener.
+        while not self._detener.wait(self.reloj.a_segundos_reales(self.intervalo_s)):
+            try:
+                guardar_snapshot(self.ruta, *self._componentes)
+            except OSError as e:
+                logging.warning("Checkpoint: no se pudo guardar el snapshot: %s", e)
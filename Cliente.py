@@ -1,7 +1,7 @@
-import time
 import logging
 import threading
 import random
+from Reloj import RELOJ_REAL
 
 class Cliente:
     """
@@ -9,22 +9,38 @@ class Cliente:
     En estado estable, con una sola instancia, la latencia promedio tenderá
     a oscilar alrededor del setpoint inicial (base_processing_ms ≈ latencia deseada).
     """
-    def __init__(self, manager, frecuencia_promedio_hz=0.25, base_processing_ms=1000):
+    def __init__(self, manager, frecuencia_promedio_hz=0.25, base_processing_ms=1000,
+                 clase_base="premium", reloj=None):
         """
         :param manager: instancia de SystemManager que recibe las peticiones.
         :param frecuencia_promedio_hz: frecuencia promedio de llegada de peticiones (Hz).
         :param base_processing_ms: tiempo de procesamiento base (ms), típicamente igual
                                    a la latencia deseada inicial.
+        :param clase_base: clase de servicio de la carga legítima de fondo.
+        :param reloj: Reloj de la simulación (por defecto, tiempo real).
         """
         self.manager = manager
-        self.frecuencia_promedio_hz = frecuencia_promedio_hz
+        self.clase_base = clase_base
+        self.reloj = reloj or RELOJ_REAL
         self.base_processing_ms = base_processing_ms
         self._thread = None
         self._running = threading.Event()
         self.sim_start_time = None
 
+        self.set_frecuencia(frecuencia_promedio_hz)
+
+        # Estado de ataque DoS
+        self._dos_lock = threading.Lock()
+        self._dos_activo = False
+
+    def set_frecuencia(self, frecuencia_promedio_hz):
+        """
+        Cambia la frecuencia de la carga base. Se aplica a partir de la próxima
+        petición (la espera en curso no se interrumpe).
+        """
         # Calcula el tiempo de espera promedio en ms y define un rango aleatorio
         tiempo_espera_promedio_ms = (1 / frecuencia_promedio_hz) * 1000 if frecuencia_promedio_hz > 0 else 1000
+        self.frecuencia_promedio_hz = frecuencia_promedio_hz
         self.espera_min_ms = int(tiempo_espera_promedio_ms * 0.5)
         self.tiempo_espera_promedio_ms = tiempo_espera_promedio_ms
         self.espera_max_ms = int(tiempo_espera_promedio_ms * 1.5)
@@ -35,9 +51,20 @@ class Cliente:
             self.espera_max_ms,
         )
 
-        # Estado de ataque DoS
-        self._dos_lock = threading.Lock()
-        self._dos_activo = False
+    def exportar_estado(self):
+        """Configuración de la carga base para un snapshot (un DoS en curso no se guarda)."""
+        return {
+            "frecuencia_promedio_hz": self.frecuencia_promedio_hz,
+            "tiempo_espera_promedio_ms": self.tiempo_espera_promedio_ms,
+            "base_processing_ms": self.base_processing_ms,
+            "clase_base": self.clase_base,
+        }
+
+    def restaurar_estado(self, estado):
+        self.frecuencia_promedio_hz = estado["frecuencia_promedio_hz"]
+        self.tiempo_espera_promedio_ms = estado["tiempo_espera_promedio_ms"]
+        self.base_processing_ms = estado["base_processing_ms"]
+        self.clase_base = estado["clase_base"]
 
     def iniciar(self, sim_start_time):
         """Inicia el hilo del cliente para que comience a generar peticiones de fondo."""
@@ -61,7 +88,7 @@ class Cliente:
         """
         while self._running.is_set(): # Usar el tiempo de espera promedio directamente
             espera_ms = self.tiempo_espera_promedio_ms
-            time.sleep(espera_ms / 1000.0)
+            self.reloj.sleep(espera_ms / 1000.0)
 
             # Procesamiento alrededor del setpoint (±20%)
             # procesamiento_ms = random.randint(
@@ -70,18 +97,19 @@ class Cliente:
             # )
             # procesamiento_sec = procesamiento_ms / 1000.0
             procesamiento_sec = 1
-            arrival_time = time.time() - self.sim_start_time
-            self.manager.receive_request(arrival_time, procesamiento_sec)
+            arrival_time = self.reloj.time() - self.sim_start_time
+            self.manager.receive_request(arrival_time, procesamiento_sec, self.clase_base)
 
-    def ejecutar_dos(self, duracion_s=6.0, frecuencia_promedio_hz=8.0):
+    def ejecutar_dos(self, duracion_s=6.0, frecuencia_promedio_hz=8.0, clase="estandar"):
         """
         Dispara un ataque DoS durante `duracion_s` segundos,
-        generando muchas más peticiones por segundo.
+        generando muchas más peticiones por segundo de la clase `clase`.
+        Devuelve False si ya había un ataque en curso (y no se dispara otro).
         """
         with self._dos_lock:
             if self._dos_activo:
                 logging.info("Cliente: ya hay un ataque DoS en curso.")
-                return
+                return False
             self._dos_activo = True
 
         logging.warning(
@@ -91,26 +119,29 @@ class Cliente:
         )
 
         def _hilo_dos():
-            fin = time.time() + duracion_s
-            while time.time() < fin and self._running.is_set():
-                if frecuencia_promedio_hz > 0: # Usar un tiempo de inter-llegada fijo para DoS
-                    dt = 1 / frecuencia_promedio_hz
-                else:
-                    dt = 0.01
-                time.sleep(dt)
-
-                # En DoS usamos rangos similares pero suficientes para saturar la cola
-                # procesamiento_ms = random.randint(
-                #     int(self.base_processing_ms * 0.8),
-                #     int(self.base_processing_ms * 1.2),
-                # )
-                # procesamiento_sec = procesamiento_ms / 1000.0
-                procesamiento_sec = 1
-                arrival_time = time.time() - self.sim_start_time
-                self.manager.receive_request(arrival_time, procesamiento_sec)
+            try:
+                fin = self.reloj.time() + duracion_s
+                while self.reloj.time() < fin and self._running.is_set():
+                    if frecuencia_promedio_hz > 0: # Usar un tiempo de inter-llegada fijo para DoS
+                        dt = 1 / frecuencia_promedio_hz
+                    else:
+                        dt = 0.01
+                    self.reloj.sleep(dt)
 
-            logging.info("Cliente: ataque DoS finalizado.")
-            with self._dos_lock:
-                self._dos_activo = False
+                    # En DoS usamos rangos similares pero suficientes para saturar la cola
+                    # procesamiento_ms = random.randint(
+                    #     int(self.base_processing_ms * 0.8),
+                    #     int(self.base_processing_ms * 1.2),
+                    # )
+                    # procesamiento_sec = procesamiento_ms / 1000.0
+                    procesamiento_sec = 1
+                    arrival_time = self.reloj.time() - self.sim_start_time
+                    self.manager.receive_request(arrival_time, procesamiento_sec, clase)
+                logging.info("Cliente: ataque DoS finalizado.")
+            finally:
+                # Aunque el hilo termine con error, debe poder lanzarse otro ataque.
+                with self._dos_lock:
+                    self._dos_activo = False
 
         threading.Thread(target=_hilo_dos, name="Cliente-DoS", daemon=True).start()
+        return True
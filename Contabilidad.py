@@ -0,0 +1,212 @@
+import threading
+
+class Contabilidad:
+    """
+    Contabilidad de costo y eficiencia de la flota de instancias.
+
+    Todas las actualizaciones son O(1): en lugar de recorrer las instancias,
+    se mantienen acumuladores cerrados más la suma de los instantes de inicio
+    de los intervalos abiertos. Por ejemplo, las instancias-segundo a tiempo t
+    son `cerradas + activas * t - suma_de_altas_activas`.
+    """
+    NUM_BINS_UTILIZACION = 10  # histograma de utilización en bins de 10%
+
+    def __init__(self, reloj, sim_start_time):
+        self.reloj = reloj
+        self.start_time = sim_start_time
+        self._lock = threading.Lock()
+        # Instancias activas: {id: [t_alta, t_inicio_trabajo o None, segundos_ocupados]}
+        self._instancias = {}
+        self._suma_altas = 0.0
+        self._instancia_segundos_cerrados = 0.0
+        self._ocupadas = 0
+        self._suma_inicios_trabajo = 0.0
+        self._segundos_ocupados_cerrados = 0.0
+        # Instancias ya destruidas: {id: (segundos_de_vida, segundos_ocupados)}
+        self._instancias_cerradas = {}
+        # Churn de escalado
+        self.altas = 0
+        self.bajas = 0
+        self.fallas = 0
+        self.lotes_escalado = 0
+        self.reversiones = 0
+        self._ultima_direccion = 0
+        # Histograma de utilización de la flota: segundos pasados en cada bin,
+        # muestreado por el Medidor (ponderar por dt lo hace válido también con
+        # muestreo adaptativo).
+        self.histograma_utilizacion = [0.0] * self.NUM_BINS_UTILIZACION
+
+    def _ahora(self):
+        return self.reloj.time() - self.start_time
+
+    # --- Eventos (SystemManager e Instancia) ---
+
+    def registrar_alta(self, id_instancia, escalado=True):
+        """
+        :param escalado: la decidió el escalado. Las del arranque y las que
+                         recrean un snapshot suman instancias-segundo pero no churn.
+        """
+        with self._lock:
+            t = self._ahora()
+            self._instancias[id_instancia] = [t, None, 0.0]
+            self._suma_altas += t
+            if escalado:
+                self.altas += 1
+
+    def registrar_baja(self, id_instancia, falla=False, escalado=True):
+        """
+        :param falla: la instancia cayó (se cuenta en `fallas`, no en `bajas`,
+                      que son sólo las decididas por el escalado).
+        :param escalado: la decidió el escalado (ver `registrar_alta`).
+        """
+        with self._lock:
+            t = self._ahora()
+            t_alta, inicio_trabajo, ocupados = self._instancias.pop(id_instancia)
+            if inicio_trabajo is not None:
+                ocupados += self._cerrar_trabajo(t, inicio_trabajo)
+            self._suma_altas -= t_alta
+            self._instancia_segundos_cerrados += t - t_alta
+            self._instancias_cerradas[id_instancia] = (t - t_alta, ocupados)
+            if falla:
+                self.fallas += 1
+            elif escalado:
+                self.bajas += 1
+
+    def registrar_lote(self, direccion):
+        """Registra una acción de escalado (+1 hacia arriba, -1 hacia abajo)."""
+        with self._lock:
+            self.lotes_escalado += 1
+            if self._ultima_direccion and direccion != self._ultima_direccion:
+                self.reversiones += 1
+            self._ultima_direccion = direccion
+
+    def registrar_inicio_trabajo(self, id_instancia):
+        with self._lock:
+            datos = self._instancias.get(id_instancia)
+            if datos is None:  # instancia ya dada de baja (apagado del sistema)
+                return
+            t = self._ahora()
+            datos[1] = t
+            self._ocupadas += 1
+            self._suma_inicios_trabajo += t
+
+    def registrar_fin_trabajo(self, id_instancia):
+        with self._lock:
+            datos = self._instancias.get(id_instancia)
+            if datos is None or datos[1] is None:
+                return
+            datos[2] += self._cerrar_trabajo(self._ahora(), datos[1])
+            datos[1] = None
+
+    def _cerrar_trabajo(self, t, inicio_trabajo):
+        duracion = t - inicio_trabajo
+        self._ocupadas -= 1
+        self._suma_inicios_trabajo -= inicio_trabajo
+        self._segundos_ocupados_cerrados += duracion
+        return duracion
+
+    def muestrear_utilizacion(self, dt_s):
+        """
+        Suma `dt_s` al bin de la utilización instantánea (ocupadas / activas).
+        :param dt_s: segundos desde la muestra anterior.
+        """
+        with self._lock:
+            if not self._instancias:
+                return
+            utilizacion = self._ocupadas / len(self._instancias)
+            indice = min(int(utilizacion * self.NUM_BINS_UTILIZACION), self.NUM_BINS_UTILIZACION - 1)
+            self.histograma_utilizacion[indice] += dt_s
+
+    # --- Consultas ---
+
+    def _instancia_segundos(self, t):
+        return self._instancia_segundos_cerrados + len(self._instancias) * t - self._suma_altas
+
+    def _segundos_ocupados(self, t):
+        return self._segundos_ocupados_cerrados + self._ocupadas * t - self._suma_inicios_trabajo
+
+    def tiempos_por_instancia(self):
+        """
+        Devuelve {id: (segundos_ocupados, segundos_ociosos)} de todas las
+        instancias de la corrida, activas (incluyendo el trabajo en curso) y destruidas.
+        """
+        with self._lock:
+            return self._tiempos_por_instancia(self._ahora())
+
+    def _tiempos_por_instancia(self, t):
+        tiempos = {id_instancia: (ocupados, vida - ocupados)
+                   for id_instancia, (vida, ocupados) in self._instancias_cerradas.items()}
+        for id_instancia, (t_alta, inicio_trabajo, ocupados) in self._instancias.items():
+            if inicio_trabajo is not None:
+                ocupados += t - inicio_trabajo
+            tiempos[id_instancia] = (ocupados, t - t_alta - ocupados)
+        return tiempos
+
+    def resumen(self, por_instancia=False):
+        """
+        Resumen de costo y eficiencia (para mostrar en vivo y al final de la corrida).
+        :param por_instancia: si es True agrega "por_instancia": {id: {ocupado_s, ocioso_s}}.
+        """
+        with self._lock:
+            t = self._ahora()
+            instancia_segundos = self._instancia_segundos(t)
+            ocupados = self._segundos_ocupados(t)
+            resumen = {
+                "instancia_segundos": instancia_segundos,
+                "segundos_ocupados": ocupados,
+                "segundos_ociosos": instancia_segundos - ocupados,
+                "utilizacion_pct": 100.0 * ocupados / instancia_segundos if instancia_segundos > 0 else 0.0,
+                "instancias_activas": len(self._instancias),
+                "altas": self.altas,
+                "bajas": self.bajas,
+                "fallas": self.fallas,
+                "lotes_escalado": self.lotes_escalado,
+                "reversiones": self.reversiones,
+                "histograma_utilizacion": list(self.histograma_utilizacion),
+            }
+            if por_instancia:
+                resumen["por_instancia"] = {
+                    str(id_instancia): {"ocupado_s": ocupado, "ocioso_s": ocioso}
+                    for id_instancia, (ocupado, ocioso) in self._tiempos_por_instancia(t).items()
+                }
+            return resumen
+
+    # --- Snapshots ---
+
+    def exportar_estado(self):
+        """
+        Acumulados para un snapshot. Las instancias activas se cierran a la hora
+        del snapshot: al restaurar, el manager las vuelve a crear (con ids nuevos)
+        sin contarlas como altas ni como lotes de escalado.
+        """
+        with self._lock:
+            t = self._ahora()
+            return {
+                "instancia_segundos": self._instancia_segundos(t),
+                "segundos_ocupados": self._segundos_ocupados(t),
+                "por_instancia": {
+                    id_instancia: (ocupado + ocioso, ocupado)
+                    for id_instancia, (ocupado, ocioso) in self._tiempos_por_instancia(t).items()
+                },
+                "altas": self.altas,
+                "bajas": self.bajas,
+                "fallas": self.fallas,
+                "lotes_escalado": self.lotes_escalado,
+                "reversiones": self.reversiones,
+                "histograma_utilizacion": list(self.histograma_utilizacion),
+            }
+
+    def restaurar_estado(self, estado):
+        """Suma los acumulados de un snapshot a los de esta corrida."""
+        with self._lock:
+            self._instancia_segundos_cerrados += estado["instancia_segundos"]
+            self._segundos_ocupados_cerrados += estado["segundos_ocupados"]
+            self._instancias_cerradas.update(estado["por_instancia"])
+            self.altas += estado["altas"]
+            self.bajas += estado["bajas"]
+            self.fallas += estado.get("fallas", 0)
+            self.lotes_escalado += estado["lotes_escalado"]
+            self.reversiones += estado["reversiones"]
+            self.histograma_utilizacion = [
+                a + b for a, b in zip(self.histograma_utilizacion, estado["histograma_utilizacion"])
+            ]
@@ -6,18 +6,30 @@ class Controlador:
     La señal de control resultante indica cuánto variar la cantidad de instancias.
     """
 
-    def __init__(self, system_manager, Kp=1.0, Kd=0.2, deadband_s=0.1):
+    # Intervalo de muestreo (50 Hz) con el que se ajustaron las ganancias.
+    INTERVALO_REFERENCIA_S = 0.02
+
+    def __init__(self, system_manager, Kp=1.0, Kd=0.2, deadband_s=0.1,
+                 intervalo_referencia_s=INTERVALO_REFERENCIA_S):
         """
         :param system_manager: gestor del sistema al que se le enviará la señal de control.
         :param Kp: Ganancia proporcional (queda implícita en los umbrales).
-        :param Kd: Ganancia derivativa (afecta la suavidad de la respuesta).
+        :param Kd: Ganancia derivativa (afecta la suavidad de la respuesta), expresada
+                   por cada `intervalo_referencia_s` transcurrido.
+        :param intervalo_referencia_s: intervalo de muestreo al que se refiere Kd; la
+                                       derivada se normaliza al tiempo real entre muestras
+                                       para que Kd valga igual a cualquier frecuencia.
         """
         self.manager = system_manager
         self.Kp = Kp
         self.Kd = Kd
         self.deadband_s = deadband_s
+        self.intervalo_referencia_s = intervalo_referencia_s
         self.error_previo = 0.0
         self.step = 0  # contador discreto de tiempo (para logs)
+        # Última señal de control continua y acción discreta enviada al actuador.
+        self.ultima_senal = 0.0
+        self.ultima_accion = 0
 
     # --- Lógica de umbrales sobre el error de latencia (en segundos) ---
 
@@ -44,6 +56,25 @@ class Controlador:
         else:
             return -2 if error_s > 0 else 2
 
+    # --- Snapshots ---
+
+    def exportar_estado(self):
+        """Estado interno del controlador para un snapshot."""
+        return {
+            "Kp": self.Kp,
+            "Kd": self.Kd,
+            "deadband_s": self.deadband_s,
+            "error_previo": self.error_previo,
+            "step": self.step,
+        }
+
+    def restaurar_estado(self, estado):
+        self.Kp = estado["Kp"]
+        self.Kd = estado["Kd"]
+        self.deadband_s = estado["deadband_s"]
+        self.error_previo = estado["error_previo"]
+        self.step = estado["step"]
+
     # --- Entrada desde el Medidor ---
 
     def recibir_error(self,
@@ -51,10 +82,13 @@ class Controlador:
                       latencia_promedio_s: float,
                       total_peticiones: int,
                       num_servers_actual: int,
-                      setpoint_s: float) -> None:
+                      setpoint_s: float,
+                      dt_s: float = None) -> None:
         """
         Recibe el error de latencia y métricas del sistema, calcula la señal de
         control PD y llama al actuador (SystemManager.scale).
+        :param dt_s: tiempo transcurrido desde la muestra anterior. Si se indica,
+                     la derivada se normaliza a `intervalo_referencia_s`.
         """
         self.step += 1
 
@@ -62,8 +96,11 @@ class Controlador:
         # La señal de control es negativa para error positivo (bajar latencia)
         accion_proporcional = -self.Kp * error_s if abs(error_s) > self.deadband_s else 0
 
-        # Parte "D": derivada discreta (Δerror) escalada por Kd
+        # Parte "D": derivada discreta (Δerror) escalada por Kd, normalizada al
+        # intervalo de referencia: Δerror / dt * intervalo_referencia.
         derivada = error_s - self.error_previo
+        if dt_s:
+            derivada *= self.intervalo_referencia_s / dt_s
         accion_derivativa = -self.Kd * derivada
 
         # La señal de control sigue siendo un float que representa la "presión" para escalar.
@@ -72,10 +109,13 @@ class Controlador:
         # AHORA, el controlador decide la acción discreta.
         # Se redondea aquí, centralizando la lógica de decisión.
         discrete_action = round(continuous_control_signal)
+        self.ultima_senal = continuous_control_signal
+        self.ultima_accion = discrete_action
 
         # Aplicamos la señal al actuador
         self.manager.scale(discrete_action) # Enviamos un entero (ej: -1, 0, 1, 2...)
-        num_servers_nuevo = len(self.manager.instancias) # El manager ya habrá actuado
+        # El escalado es asíncrono: informamos el objetivo que fijó el manager.
+        num_servers_nuevo = self.manager.instancias_objetivo
 
         # Logging estilo ejemplo, pero con tiempo medio de respuesta
         logging.info(
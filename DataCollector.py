@@ -1,12 +1,21 @@
-import time
 import threading
+from array import array
+from bisect import bisect_left
+from Reloj import RELOJ_REAL
+from Peticion import CLASE_POR_DEFECTO
+from Contabilidad import Contabilidad
 
 class DataCollector:
     """
     Almacena los datos de la simulación en cada punto de tiempo.
     """
-    def __init__(self, sim_start_time):
+    # Límites superiores (s) de los buckets del histograma de latencias por
+    # clase; el último bucket (implícito) es +Inf.
+    BORDES_LATENCIA_S = (0.1, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+    def __init__(self, sim_start_time, reloj=None):
         self.start_time = sim_start_time
+        self.reloj = reloj or RELOJ_REAL
         self.lock = threading.Lock()
         self.timestamps = []          # segundos desde inicio
         self.latencias_promedio = []  # en segundos
@@ -14,46 +23,142 @@ class DataCollector:
         self.peticiones_activas = []
         self.errores = []             # en segundos
         self.peticiones_nuevas = []
-        # Para el cálculo de SLO: (timestamp, latencia_individual_s)
+        # Latencia promedio por clase de petición: {clase: [latencia_s, ...]}
+        # alineada con timestamps.
+        self.latencias_por_clase = {}
+        # Para el cálculo de SLO: (timestamp, latencia_individual_s, clase)
         self.peticiones_resueltas = []
-
+        # Duración (s) de cada tick del Medidor (medición + control + actuación)
+        # y cantidad de muestras que se perdieron por ticks más largos que el intervalo.
+        self.duraciones_tick = []
+        self.muestras_perdidas = 0
+        # Histograma de latencias por clase, acumulado al resolver cada petición
+        # para publicar métricas sin recorrer peticiones_resueltas:
+        # {clase: [conteo por bucket (len(BORDES_LATENCIA_S) + 1)]} y {clase: suma_s}.
+        self.histograma_latencias = {}
+        self.suma_latencias = {}
+        # Costo y eficiencia de la flota (instancias-segundo, ocupación, churn).
+        self.contabilidad = Contabilidad(self.reloj, sim_start_time)
 
     def collect(self, latencia_promedio_s, num_instancias, peticiones_activas,
-                error_s, peticiones_nuevas):
-        """Registra una nueva entrada de datos."""
+                error_s, peticiones_nuevas, latencias_por_clase=None):
+        """
+        Registra una nueva entrada de datos.
+        :param latencias_por_clase: dict {clase: latencia_promedio_s}. El Medidor
+                                    informa siempre todas las clases para que las
+                                    series queden alineadas con timestamps.
+        """
         with self.lock:
-            current_time = time.time() - self.start_time
+            current_time = self.reloj.time() - self.start_time
             self.timestamps.append(current_time)
             self.latencias_promedio.append(latencia_promedio_s)
             self.cantidad_instancias.append(num_instancias)
             self.peticiones_activas.append(peticiones_activas)
             self.errores.append(error_s)
             self.peticiones_nuevas.append(peticiones_nuevas)
+            for clase, latencia_s in (latencias_por_clase or {}).items():
+                self.latencias_por_clase.setdefault(clase, []).append(latencia_s)
 
-    def collect_peticion_resuelta(self, latencia_s: float):
+    def collect_tick(self, duracion_s: float, muestras_perdidas: int = 0):
+        """Registra la duración de un tick del Medidor."""
+        with self.lock:
+            self.duraciones_tick.append(duracion_s)
+            self.muestras_perdidas += muestras_perdidas
+
+    def exportar_estado(self):
+        """
+        Copia de los buffers para un snapshot. Las series numéricas se guardan
+        como `array('d')`, que se serializa en binario compacto.
+        """
+        with self.lock:
+            return {
+                "timestamps": array('d', self.timestamps),
+                "latencias_promedio": array('d', self.latencias_promedio),
+                "cantidad_instancias": array('d', self.cantidad_instancias),
+                "peticiones_activas": array('d', self.peticiones_activas),
+                "errores": array('d', self.errores),
+                "peticiones_nuevas": array('d', self.peticiones_nuevas),
+                "latencias_por_clase": {
+                    clase: array('d', serie) for clase, serie in self.latencias_por_clase.items()
+                },
+                "resueltas_t": array('d', (p[0] for p in self.peticiones_resueltas)),
+                "resueltas_latencia": array('d', (p[1] for p in self.peticiones_resueltas)),
+                "resueltas_clase": [p[2] for p in self.peticiones_resueltas],
+                "duraciones_tick": array('d', self.duraciones_tick),
+                "muestras_perdidas": self.muestras_perdidas,
+                "contabilidad": self.contabilidad.exportar_estado(),
+            }
+
+    def restaurar_estado(self, estado):
+        with self.lock:
+            self.timestamps = list(estado["timestamps"])
+            self.latencias_promedio = list(estado["latencias_promedio"])
+            self.cantidad_instancias = [int(n) for n in estado["cantidad_instancias"]]
+            self.peticiones_activas = [int(n) for n in estado["peticiones_activas"]]
+            self.errores = list(estado["errores"])
+            self.peticiones_nuevas = [int(n) for n in estado["peticiones_nuevas"]]
+            self.latencias_por_clase = {
+                clase: list(serie) for clase, serie in estado["latencias_por_clase"].items()
+            }
+            self.peticiones_resueltas = list(zip(
+                estado["resueltas_t"], estado["resueltas_latencia"], estado["resueltas_clase"]
+            ))
+            self.duraciones_tick = list(estado["duraciones_tick"])
+            self.muestras_perdidas = estado["muestras_perdidas"]
+            self.histograma_latencias = {}
+            self.suma_latencias = {}
+            for _, latencia_s, clase in self.peticiones_resueltas:
+                self._acumular_latencia(latencia_s, clase)
+        if "contabilidad" in estado:
+            self.contabilidad.restaurar_estado(estado["contabilidad"])
+
+    def collect_peticion_resuelta(self, latencia_s: float, clase: str = CLASE_POR_DEFECTO):
         """Registra la latencia de una petición individual cuando se completa."""
         with self.lock:
-            current_time = time.time() - self.start_time
-            self.peticiones_resueltas.append((current_time, latencia_s))
+            current_time = self.reloj.time() - self.start_time
+            self.peticiones_resueltas.append((current_time, latencia_s, clase))
+            self._acumular_latencia(latencia_s, clase)
+
+    def _acumular_latencia(self, latencia_s, clase):
+        """Suma una latencia al histograma de su clase. Debe llamarse con lock tomado."""
+        conteos = self.histograma_latencias.get(clase)
+        if conteos is None:
+            conteos = self.histograma_latencias[clase] = [0] * (len(self.BORDES_LATENCIA_S) + 1)
+            self.suma_latencias[clase] = 0.0
+        conteos[bisect_left(self.BORDES_LATENCIA_S, latencia_s)] += 1
+        self.suma_latencias[clase] += latencia_s
+
+    def get_histograma_latencias(self):
+        """Devuelve {clase: (conteos_por_bucket, suma_s)} (copias)."""
+        with self.lock:
+            return {
+                clase: (list(conteos), self.suma_latencias[clase])
+                for clase, conteos in self.histograma_latencias.items()
+            }
 
-    def get_slo_compliance(self, window_seconds: int, setpoint_s: float, error_band_s: float) -> float:
+    def get_slo_compliance(self, window_seconds: int, setpoint_s: float, error_band_s: float,
+                           clase: str = None) -> float:
         """
         Calcula el porcentaje de peticiones resueltas en la última ventana de tiempo
         que cayeron dentro de la banda de error (setpoint ± error_band).
+        Si se indica `clase`, sólo se consideran las peticiones de esa clase.
         """
         with self.lock:
             if not self.peticiones_resueltas:
                 return 100.0
 
-            now = time.time() - self.start_time
+            now = self.reloj.time() - self.start_time
             limite_inferior_tiempo = now - window_seconds
 
-            peticiones_recientes = [p for p in self.peticiones_resueltas if p[0] >= limite_inferior_tiempo]
+            peticiones_recientes = [
+                p for p in self.peticiones_resueltas
+                if p[0] >= limite_inferior_tiempo and (clase is None or p[2] == clase)
+            ]
             if not peticiones_recientes:
                 return 100.0
 
             # Nueva lógica: una petición cumple si su latencia es MENOR O IGUAL al umbral máximo tolerable.
             # No penalizamos las peticiones que son más rápidas que el setpoint.
             umbral_maximo_tolerable = setpoint_s + error_band_s
-            dentro_de_banda = sum(1 for _, lat in peticiones_recientes if lat <= umbral_maximo_tolerable)
+            dentro_de_banda = sum(1 for _, lat, _ in peticiones_recientes if lat <= umbral_maximo_tolerable)
             return (dentro_de_banda / len(peticiones_recientes)) * 100.0
\ No newline at end of file
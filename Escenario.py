@@ -0,0 +1,184 @@
+import json
+import logging
+import threading
+from Reloj import RELOJ_REAL
+from Peticion import CLASES_POR_DEFECTO
+
+# Tipos de evento de la línea de tiempo y sus campos obligatorios (además de "t").
+TIPOS_EVENTO = {
+    "dos": ("duracion_s", "frecuencia_hz"),     # opcional: "clase" (por defecto "estandar")
+    "frecuencia": ("hz",),                      # cambia la carga base del Cliente
+    "rampa": ("hasta_hz", "duracion_s"),        # rampa lineal de la carga base; opcional: "paso_s"
+    "setpoint": ("latencia_s",),                # opcional: "clase" para un setpoint por clase
+    "max_servers": ("valor",),
+    "falla": ("instancias",),                   # caída abrupta de instancias
+}
+PASO_RAMPA_S = 1.0
+
+def cargar_escenario(ruta):
+    """
+    Lee y valida un escenario en JSON:
+
+        {
+          "nombre": "dos_y_falla",
+          "duracion_s": 120,
+          "frecuencia_base_hz": 1.0,
+          "eventos": [
+            {"t": 30, "tipo": "dos", "duracion_s": 6, "frecuencia_hz": 8},
+            {"t": 60, "tipo": "rampa", "hasta_hz": 3, "duracion_s": 20},
+            {"t": 90, "tipo": "setpoint", "latencia_s": 0.8},
+            {"t": 95, "tipo": "max_servers", "valor": 10},
+            {"t": 100, "tipo": "falla", "instancias": 2}
+          ]
+        }
+
+    `t` son segundos simulados desde el inicio de la corrida.
+    :return: dict con los eventos ordenados por `t`.
+    :raises ValueError: si el escenario es inválido.
+    """
+    with open(ruta, "r", encoding="utf-8") as archivo:
+        escenario = json.load(archivo)
+    if "duracion_s" not in escenario:
+        raise ValueError(f"Escenario {ruta}: falta 'duracion_s'.")
+    for i, evento in enumerate(escenario.get("eventos", [])):
+        tipo = evento.get("tipo")
+        if tipo not in TIPOS_EVENTO:
+            raise ValueError(f"Escenario {ruta}: evento {i} de tipo desconocido: {tipo}")
+        faltantes = [campo for campo in ("t",) + TIPOS_EVENTO[tipo] if campo not in evento]
+        if faltantes:
+            raise ValueError(f"Escenario {ruta}: al evento {i} ({tipo}) le faltan {faltantes}")
+        if "clase" in evento and evento["clase"] not in CLASES_POR_DEFECTO:
+            raise ValueError(f"Escenario {ruta}: el evento {i} ({tipo}) tiene una clase desconocida: "
+                             f"{evento['clase']} (clases: {sorted(CLASES_POR_DEFECTO)})")
+    escenario.setdefault("nombre", ruta)
+    escenario["eventos"] = sorted(escenario.get("eventos", []), key=lambda e: e["t"])
+    return escenario
+
+class Escenario:
+    """
+    Reproduce la línea de tiempo de un escenario sobre la simulación: un hilo
+    duerme en el Reloj de la simulación hasta el instante de cada evento y lo
+    aplica, de modo que el mismo escenario se repite igual en tiempo real y en
+    modo acelerado. Al retomar un snapshot se omiten los eventos anteriores a
+    él; los que ya vencieron cuando arranca el hilo (la preparación de la
+    corrida lleva su tiempo) se aplican de inmediato.
+
+    Las rampas se expanden al crear el escenario en cambios de frecuencia cada
+    `paso_s`, partiendo de la frecuencia que tendrá el Cliente en ese momento.
+    Al retomar un snapshot se conserva la frecuencia restaurada del Cliente y
+    una rampa que ya estaba en curso sigue desde ella hasta su destino.
+    """
+
+    def __init__(self, escenario, cliente, manager, medidor, reloj=None, t_restaurado_s=None):
+        """
+        :param escenario: dict devuelto por `cargar_escenario`.
+        :param cliente: Cliente que genera la carga.
+        :param manager: SystemManager (límite de instancias y fallas).
+        :param medidor: Medidor (setpoints).
+        :param reloj: Reloj de la simulación.
+        :param t_restaurado_s: instante simulado del snapshot restaurado, o None
+                               si la corrida empieza de cero.
+        """
+        self.nombre = escenario["nombre"]
+        self.duracion_s = escenario["duracion_s"]
+        self.cliente = cliente
+        self.manager = manager
+        self.medidor = medidor
+        self.reloj = reloj or RELOJ_REAL
+        if "frecuencia_base_hz" in escenario and t_restaurado_s is None:
+            self.cliente.set_frecuencia(escenario["frecuencia_base_hz"])
+        self.t_restaurado_s = t_restaurado_s or 0.0
+        self.eventos = self._expandir_rampas(escenario["eventos"], self.cliente.frecuencia_promedio_hz,
+                                             self.t_restaurado_s)
+        self.sim_start_time = None
+        self._detener = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _expandir_rampas(eventos, frecuencia_inicial_hz, t_inicio_s=0.0):
+        """
+        :param frecuencia_inicial_hz: frecuencia del Cliente en `t_inicio_s`.
+        :param t_inicio_s: los eventos anteriores ya ocurrieron (snapshot) y no
+                           cambian la frecuencia de partida; de una rampa en
+                           curso se expande sólo el tramo restante.
+        """
+        expandidos = []
+        frecuencia_hz = frecuencia_inicial_hz
+        for evento in eventos:
+            if evento["tipo"] == "rampa":
+                t_fin = evento["t"] + evento["duracion_s"]
+                if t_fin <= t_inicio_s:
+                    continue
+                t_desde = max(evento["t"], t_inicio_s)
+                duracion_s = t_fin - t_desde
+                paso_s = evento.get("paso_s", PASO_RAMPA_S)
+                pasos = max(1, int(round(duracion_s / paso_s)))
+                for k in range(1, pasos + 1):
+                    expandidos.append({
+                        "t": t_desde + k * duracion_s / pasos,
+                        "tipo": "frecuencia",
+                        "hz": frecuencia_hz + (evento["hasta_hz"] - frecuencia_hz) * k / pasos,
+                    })
+                frecuencia_hz = evento["hasta_hz"]
+            elif evento["t"] < t_inicio_s:
+                expandidos.append(evento)  # `_reproducir` lo omite
+            else:
+                if evento["tipo"] == "frecuencia":
+                    frecuencia_hz = evento["hz"]
+                expandidos.append(evento)
+        return sorted(expandidos, key=lambda e: e["t"])
+
+    def iniciar(self, sim_start_time):
+        self.sim_start_time = sim_start_time
+        self._detener.clear()
+        self._thread = threading.Thread(target=self._reproducir, name="Escenario", daemon=True)
+        self._thread.start()
+        logging.info("Escenario '%s': %d eventos programados en %.0f s.",
+                     self.nombre, len(self.eventos), self.duracion_s)
+
+    def detener(self):
+        self._detener.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        logging.info("Escenario '%s': detenido.", self.nombre)
+
+    def _reproducir(self):
+        for evento in self.eventos:
+            if evento["t"] < self.t_restaurado_s:
+                logging.info("Escenario: evento %s en t=%.1fs anterior al snapshot, se omite.",
+                             evento["tipo"], evento["t"])
+                continue
+            # Volvemos a medir tras cada espera: Event.wait puede despertar antes.
+            restante = evento["t"] - (self.reloj.time() - self.sim_start_time)
+            while restante > 0:
+                if self._detener.wait(self.reloj.a_segundos_reales(restante)):
+                    return
+                restante = evento["t"] - (self.reloj.time() - self.sim_start_time)
+            retraso_s = self.reloj.time() - self.sim_start_time - evento["t"]
+            self._aplicar(evento)
+            logging.info("Escenario: evento %s aplicado en t=%.2fs (retraso %.1f ms).",
+                         evento["tipo"], evento["t"], retraso_s * 1000)
+        logging.info("Escenario '%s': línea de tiempo completada.", self.nombre)
+
+    def _aplicar(self, evento):
+        tipo = evento["tipo"]
+        if tipo == "dos":
+            if not self.cliente.ejecutar_dos(duracion_s=evento["duracion_s"],
+                                             frecuencia_promedio_hz=evento["frecuencia_hz"],
+                                             clase=evento.get("clase", "estandar")):
+                logging.warning("Escenario: DoS en t=%.1fs ignorado (ya hay uno en curso).", evento["t"])
+        elif tipo == "frecuencia":
+            self.cliente.set_frecuencia(evento["hz"])
+        elif tipo == "setpoint":
+            if "clase" in evento:
+                # Se reemplaza el dict entero: el Medidor lo recorre desde su hilo.
+                self.medidor.setpoints_por_clase_s = {**self.medidor.setpoints_por_clase_s,
+                                                      evento["clase"]: evento["latencia_s"]}
+            else:
+                self.medidor.latencia_deseada_s = evento["latencia_s"]
+                # Igual que el TextBox del Plotter: el Cliente sigue al setpoint.
+                self.cliente.base_processing_ms = int(evento["latencia_s"] * 1000)
+        elif tipo == "max_servers":
+            self.manager.set_max_servers(evento["valor"])
+        elif tipo == "falla":
+            self.manager.fallar_instancias(evento["instancias"])
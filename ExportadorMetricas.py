@@ -0,0 +1,177 @@
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class ExportadorMetricas:
+    """
+    Endpoint HTTP local opcional que publica métricas en el formato de texto
+    de Prometheus (`GET /metrics`), para observar corridas largas sin GUI
+    desde dashboards externos.
+
+    Todas las métricas salen de contadores ya agregados (histograma de
+    latencias del DataCollector, contadores del SystemManager, Contabilidad,
+    última señal del Controlador): un scrape no recorre las listas de datos
+    crudos, así que su costo no crece con la duración de la corrida.
+    """
+    RUTA = "/metrics"
+    TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+    CUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+    def __init__(self, data_collector, manager, controlador, host="127.0.0.1", puerto=9100):
+        """
+        :param data_collector: origen del histograma de latencias y la contabilidad.
+        :param manager: SystemManager (colas, instancias, peticiones descartadas).
+        :param controlador: Controlador (última señal de control).
+        :param host: dirección en la que escuchar.
+        :param puerto: puerto TCP.
+        """
+        self.data_collector = data_collector
+        self.manager = manager
+        self.controlador = controlador
+        self.host = host
+        self.puerto = puerto
+        self._server = None
+        self._thread = None
+
+    def iniciar(self):
+        """Inicia el servidor en un hilo propio."""
+        exportador = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != exportador.RUTA:
+                    self.send_error(404)
+                    return
+                cuerpo = exportador.renderizar().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", exportador.TIPO_CONTENIDO)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                logging.debug("ExportadorMetricas: " + formato, *args)
+
+        self._server = ThreadingHTTPServer((self.host, self.puerto), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ExportadorMetricas", daemon=True)
+        self._thread.start()
+        logging.info("ExportadorMetricas: escuchando en http://%s:%d%s", self.host, self.puerto, self.RUTA)
+
+    def detener(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=2.0)
+        logging.info("ExportadorMetricas: detenido.")
+
+    # --- Formato de texto de Prometheus ---
+
+    def renderizar(self):
+        """Devuelve el cuerpo de `/metrics`."""
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, muestras):
+            """:param muestras: lista de (sufijo, etiquetas, valor)."""
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for sufijo, etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{sufijo}{_etiquetas(etiquetas)} {_valor(valor)}")
+
+        # Latencias: histograma por clase y cuantiles estimados a partir de él.
+        bordes = self.data_collector.BORDES_LATENCIA_S
+        histogramas = self.data_collector.get_histograma_latencias()
+        buckets, cuantiles = [], []
+        for clase, (conteos, suma) in sorted(histogramas.items()):
+            acumulado = 0
+            for borde, conteo in zip(bordes + (float("inf"),), conteos):
+                acumulado += conteo
+                buckets.append(("_bucket", {"clase": clase, "le": borde}, acumulado))
+            buckets.append(("_sum", {"clase": clase}, suma))
+            buckets.append(("_count", {"clase": clase}, acumulado))
+            for q in self.CUANTILES:
+                cuantiles.append(("", {"clase": clase, "quantile": q}, _cuantil(bordes, conteos, q)))
+            cuantiles.append(("_sum", {"clase": clase}, suma))
+            cuantiles.append(("_count", {"clase": clase}, acumulado))
+        metrica("tdc_latencia_segundos", "histogram",
+                "Latencia de punta a punta de las peticiones resueltas.", buckets)
+        metrica("tdc_latencia_cuantiles_segundos", "summary",
+                "Cuantiles de latencia estimados por interpolación sobre el histograma.", cuantiles)
+
+        # Colas y peticiones.
+        profundidad, recibidas, descartadas = self.manager.get_contadores_colas()
+        metrica("tdc_cola_profundidad", "gauge", "Peticiones en cola por clase.",
+                [("", {"clase": clase}, n) for clase, n in profundidad.items()])
+        metrica("tdc_peticiones_recibidas_total", "counter", "Peticiones recibidas por clase.",
+                [("", {"clase": clase}, n) for clase, n in recibidas.items()])
+        metrica("tdc_peticiones_descartadas_total", "counter",
+                "Peticiones descartadas sin procesar (no hay rechazo por carga: sólo las que se pierden).",
+                [("", {}, descartadas)])
+
+        # Flota y control.
+        metrica("tdc_instancias", "gauge", "Instancias activas.", [("", {}, len(self.manager.instancias))])
+        metrica("tdc_instancias_objetivo", "gauge", "Instancias objetivo fijadas por el controlador.",
+                [("", {}, self.manager.instancias_objetivo)])
+        metrica("tdc_instancias_maximo", "gauge", "Límite superior de instancias.",
+                [("", {}, self.manager.max_servers)])
+        metrica("tdc_senal_control", "gauge", "Última señal de control continua (PD).",
+                [("", {}, self.controlador.ultima_senal)])
+        metrica("tdc_accion_control", "gauge", "Última acción discreta enviada al actuador.",
+                [("", {}, self.controlador.ultima_accion)])
+        metrica("tdc_medidor_muestras_perdidas_total", "counter",
+                "Muestras del Medidor salteadas por quedar atrasadas un intervalo entero o más.",
+                [("", {}, self.data_collector.muestras_perdidas)])
+
+        # Costo y eficiencia.
+        costo = self.data_collector.contabilidad.resumen()
+        metrica("tdc_instancia_segundos_total", "counter", "Instancias-segundo acumuladas.",
+                [("", {}, costo["instancia_segundos"])])
+        metrica("tdc_instancia_segundos_ocupados_total", "counter", "Segundos ocupados acumulados de la flota.",
+                [("", {}, costo["segundos_ocupados"])])
+        metrica("tdc_utilizacion_ratio", "gauge", "Utilización acumulada de la flota (ocupado / instancias-segundo).",
+                [("", {}, costo["utilizacion_pct"] / 100.0)])
+        metrica("tdc_escalado_eventos_total", "counter", "Churn de escalado por tipo de evento.", [
+            ("", {"tipo": "alta"}, costo["altas"]),
+            ("", {"tipo": "baja"}, costo["bajas"]),
+            ("", {"tipo": "falla"}, costo["fallas"]),
+            ("", {"tipo": "lote"}, costo["lotes_escalado"]),
+            ("", {"tipo": "reversion"}, costo["reversiones"]),
+        ])
+        return "\n".join(lineas) + "\n"
+
+def _cuantil(bordes, conteos, q):
+    """
+    Estima el cuantil `q` interpolando linealmente dentro del bucket que lo
+    contiene (como histogram_quantile de Prometheus). Si cae en el bucket
+    +Inf devuelve el último borde finito; NaN si no hay datos.
+    """
+    total = sum(conteos)
+    if total == 0:
+        return float("nan")
+    rango = q * total
+    acumulado = 0
+    for i, conteo in enumerate(conteos):
+        if acumulado + conteo >= rango and conteo > 0:
+            if i == len(bordes):
+                return bordes[-1]
+            inferior = bordes[i - 1] if i > 0 else 0.0
+            return inferior + (bordes[i] - inferior) * (rango - acumulado) / conteo
+        acumulado += conteo
+    return bordes[-1]
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    pares = ",".join(f'{clave}="{_valor(valor) if isinstance(valor, float) else valor}"'
+                     for clave, valor in etiquetas.items())
+    return "{" + pares + "}"
+
+def _valor(valor):
+    if isinstance(valor, float):
+        if valor != valor:
+            return "NaN"
+        if valor in (float("inf"), float("-inf")):
+            return "+Inf" if valor > 0 else "-Inf"
+        return repr(valor)
+    return str(valor)
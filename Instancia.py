@@ -1,22 +1,37 @@
-import time
 import logging
 import threading
 import queue
+from Peticion import CLASE_POR_DEFECTO
+from Reloj import RELOJ_REAL
 
 class Instancia:
     """
     Representa una instancia de servidor que puede procesar una petición a la vez.
+    Si se indica un `ejecutor` (ver TrabajoCPU.EjecutorCPU) el procesamiento es
+    trabajo de CPU real; si no, se simula durmiendo en el reloj de la simulación.
     """
-    def __init__(self, id_instancia, semaforo, data_collector):
+    def __init__(self, id_instancia, semaforo, data_collector, ejecutor=None, reloj=None,
+                 al_liberarse=None, corte_lock=None):
         self.id = id_instancia
         self.peticiones = queue.Queue(maxsize=1)
         self._thread = threading.Thread(target=self._bucle_procesamiento, daemon=True)
         self.semaforo = semaforo
         self._lock = threading.Lock()
         self.arrival_time_actual = None
+        self.clase_actual = None
+        self.tiempo_procesamiento_actual = None
+        self.inicio_procesamiento_actual = None
         self._ocupado = False
+        self._fallida = False
         self._activo = threading.Event()
         self.data_collector = data_collector
+        self.ejecutor = ejecutor
+        self.reloj = reloj or RELOJ_REAL
+        # Callable opcional que se invoca cada vez que la instancia queda libre.
+        self.al_liberarse = al_liberarse
+        # Lock del corte de snapshots (SystemManager.corte_lock): registrar la
+        # petición como resuelta y dejar de tenerla en curso es un solo paso.
+        self.corte_lock = corte_lock or threading.Lock()
 
     def iniciar(self):
         if not self._thread.is_alive():
@@ -25,19 +40,43 @@ class Instancia:
             logging.info(f"Instancia {self.id}: Iniciada.")
 
     def detener(self):
+        self.solicitar_detencion()
+        self.esperar_detencion()
+
+    def solicitar_detencion(self):
+        """Pide al hilo que termine, sin esperarlo (para detener muchas en paralelo)."""
         if self._thread.is_alive():
             self._activo.clear()
             try:
                 self.peticiones.put_nowait(None)
             except queue.Full:
                 pass
+
+    def fallar(self):
+        """
+        Simula una caída abrupta: la instancia deja de atender y la petición en
+        curso (si la hay) se pierde sin registrarse ni devolver su ticket al
+        semáforo. A diferencia de `detener`, no espera al hilo.
+        """
+        with self._lock:
+            self._fallida = True
+        self.solicitar_detencion()
+
+    def esperar_detencion(self):
+        if self._thread.is_alive():
             self._thread.join()
             logging.info(f"Instancia {self.id}: Detenida.")
 
-    def recibir_peticion(self, arrival_time, processing_time):
+    def recibir_peticion(self, arrival_time, processing_time, clase=CLASE_POR_DEFECTO, al_finalizar=None):
         with self._lock:
+            # Se marca ocupada ya al asignarla, para que ni el despachador ni el
+            # reconciliador la vean libre antes de que el hilo tome la petición.
+            self._ocupado = True
             self.arrival_time_actual = arrival_time
-        self.peticiones.put((arrival_time, processing_time))
+            self.clase_actual = clase
+            self.tiempo_procesamiento_actual = processing_time
+            self.inicio_procesamiento_actual = None
+        self.peticiones.put((arrival_time, processing_time, clase, al_finalizar))
 
     def esta_libre(self):
         with self._lock:
@@ -45,31 +84,75 @@ class Instancia:
 
     def get_datos_peticion_actual(self):
         with self._lock:
-            return self._ocupado, self.arrival_time_actual
+            return self._ocupado, self.arrival_time_actual, self.clase_actual
+
+    def get_peticion_en_curso(self):
+        """
+        Devuelve (arrival_time, tiempo_restante_s, clase) de la petición asignada
+        a esta instancia, o None si está libre. Se usa para los snapshots.
+        """
+        with self._lock:
+            if self.arrival_time_actual is None:
+                return None
+            restante = self.tiempo_procesamiento_actual
+            if self.inicio_procesamiento_actual is not None:
+                transcurrido = self.reloj.time() - self.inicio_procesamiento_actual
+                restante = max(0.0, restante - transcurrido)
+            return self.arrival_time_actual, restante, self.clase_actual
 
     def _bucle_procesamiento(self):
         while self._activo.is_set():
             peticion = self.peticiones.get()
             if peticion is None:
                 break
-            arrival_time, tiempo_procesamiento = peticion
+            arrival_time, tiempo_procesamiento, clase, al_finalizar = peticion
             with self._lock:
+                fallida = self._fallida
                 self._ocupado = True
+                self.inicio_procesamiento_actual = self.reloj.time()
+            if fallida:
+                self._perder_peticion(al_finalizar)
+                break
+            self.data_collector.contabilidad.registrar_inicio_trabajo(self.id)
             logging.info(
                 "Instancia %s: Comienza a procesar petición que tardara %.3fs.",
                 self.id,
                 tiempo_procesamiento,
             )
-            time.sleep(tiempo_procesamiento)
-            
-            # Informar al DataCollector sobre la petición resuelta
-            finish_time = time.time() - self.data_collector.start_time
-            latencia_total_s = finish_time - arrival_time
-            self.data_collector.collect_peticion_resuelta(latencia_total_s)
+            if self.ejecutor is not None:
+                # El trabajo de CPU es real: lo escalamos al factor del reloj.
+                self.ejecutor.procesar(self.reloj.a_segundos_reales(tiempo_procesamiento))
+            else:
+                self.reloj.sleep(tiempo_procesamiento)
+            self.data_collector.contabilidad.registrar_fin_trabajo(self.id)
 
             with self._lock:
-                self._ocupado = False
-                self.arrival_time_actual = None
+                fallida = self._fallida
+            if fallida:
+                self._perder_peticion(al_finalizar)
+                break
+
+            # Informar al DataCollector sobre la petición resuelta
+            finish_time = self.reloj.time() - self.data_collector.start_time
+            latencia_total_s = finish_time - arrival_time
+            with self.corte_lock:
+                self.data_collector.collect_peticion_resuelta(latencia_total_s, clase)
+                with self._lock:
+                    self._ocupado = False
+                    self.arrival_time_actual = None
+                    self.clase_actual = None
+                    self.tiempo_procesamiento_actual = None
+                    self.inicio_procesamiento_actual = None
+            if al_finalizar is not None:
+                al_finalizar(latencia_total_s)
             self.semaforo.release()
+            if self.al_liberarse is not None:
+                self.al_liberarse()
             logging.info("Instancia %s: Peticion finalizada. Esperando nueva petición.", self.id)
-            self.peticiones.task_done()
\ No newline at end of file
+            self.peticiones.task_done()
+
+    def _perder_peticion(self, al_finalizar):
+        """La instancia cayó con una petición asignada: se pierde sin registrarse."""
+        if al_finalizar is not None:
+            al_finalizar(None)
+        logging.info("Instancia %s: caida, peticion en curso perdida.", self.id)
@@ -1,28 +1,60 @@
-import time
+import math
 import logging
 import threading
+from collections import deque
+from Reloj import RELOJ_REAL
 
 class Medidor:
     """
     Mide la latencia promedio del sistema y genera una señal de error.
+
+    En modo adaptativo el intervalo de medición se recalcula en cada muestra:
+    vuelve al mínimo en cuanto el error o la tasa de llegadas cambian rápido, y
+    se alarga gradualmente (hasta el máximo) mientras el sistema está estable.
     """
+    # Parámetros del modo adaptativo (tiempos en segundos simulados).
+    UMBRAL_DERIVADA_ERROR = 0.5       # s/s sobre el error suavizado
+    TAU_ERROR_S = 1.0                 # suavizado del error (filtra el diente de sierra de la edad)
+    VENTANA_LLEGADAS_S = 1.0          # ventana de conteo de llegadas recientes
+    TAU_TASA_S = 10.0                 # promedio de largo plazo de la tasa de llegadas
+    FACTOR_RELAJACION = 1.25          # crecimiento del intervalo en régimen estable
 
     def __init__(self, system_manager, controlador, data_collector,
-                 sim_start_time, latencia_deseada_ms=200, intervalo_medicion_ms=20):
+                 sim_start_time, latencia_deseada_ms=200, intervalo_medicion_ms=20,
+                 setpoints_por_clase_ms=None, reloj=None, muestreo_adaptativo=False,
+                 intervalo_min_ms=10, intervalo_max_ms=500):
         """
         :param system_manager: El gestor del sistema que contiene las instancias.
         :param controlador: El controlador PD al que se le enviará la señal de error.
         :param data_collector: Objeto para registrar los datos de la simulación.
-        :param sim_start_time: Tiempo de inicio de la simulación (time.time()).
+        :param sim_start_time: Tiempo de inicio de la simulación (reloj.time()).
         :param latencia_deseada_ms: Valor de referencia para la latencia (ms).
         :param intervalo_medicion_ms: Cada cuántos ms se mide la latencia.
+        :param setpoints_por_clase_ms: dict opcional {clase: latencia_deseada_ms}. Si se
+                                       indica, el error enviado al controlador es el de la
+                                       clase controlada que más se aleja de su setpoint, y
+                                       las clases sin setpoint no provocan escalado.
+        :param reloj: Reloj de la simulación (por defecto, tiempo real).
+        :param muestreo_adaptativo: si es True, el intervalo varía entre intervalo_min_ms
+                                    e intervalo_max_ms según la dinámica de la carga.
         """
         self.manager = system_manager
         self.controlador = controlador
         self.data_collector = data_collector
         self.sim_start_time = sim_start_time
+        self.reloj = reloj or RELOJ_REAL
         self.latencia_deseada_s = latencia_deseada_ms / 1000.0
         self.intervalo_medicion_s = intervalo_medicion_ms / 1000.0
+        self.setpoints_por_clase_s = {
+            clase: sp_ms / 1000.0 for clase, sp_ms in (setpoints_por_clase_ms or {}).items()
+        }
+        self.muestreo_adaptativo = muestreo_adaptativo
+        self.intervalo_min_s = intervalo_min_ms / 1000.0
+        self.intervalo_max_s = intervalo_max_ms / 1000.0
+        self._error_suavizado = None
+        self._tasa_llegadas_promedio = None
+        self._llegadas_recientes = deque()  # (instante, peticiones_nuevas)
+        self._llegadas_en_ventana = 0
         self._thread = threading.Thread(target=self._bucle_medicion, daemon=True)
         self._activo = threading.Event()
 
@@ -38,15 +70,49 @@ class Medidor:
         self._thread.join()
         logging.info("Medidor: Detenido.")
 
+    def exportar_estado(self):
+        """Configuración del sensor para un snapshot."""
+        return {
+            "latencia_deseada_s": self.latencia_deseada_s,
+            "intervalo_medicion_s": self.intervalo_medicion_s,
+            "setpoints_por_clase_s": dict(self.setpoints_por_clase_s),
+            "muestreo_adaptativo": self.muestreo_adaptativo,
+            "intervalo_min_s": self.intervalo_min_s,
+            "intervalo_max_s": self.intervalo_max_s,
+        }
+
+    def restaurar_estado(self, estado):
+        self.latencia_deseada_s = estado["latencia_deseada_s"]
+        self.intervalo_medicion_s = estado["intervalo_medicion_s"]
+        self.setpoints_por_clase_s = dict(estado["setpoints_por_clase_s"])
+        self.muestreo_adaptativo = estado["muestreo_adaptativo"]
+        self.intervalo_min_s = estado["intervalo_min_s"]
+        self.intervalo_max_s = estado["intervalo_max_s"]
+
     def _bucle_medicion(self):
         """Bucle principal que mide periódicamente la latencia."""
+        ultima_muestra = self.reloj.time()
+        # Cronograma ideal: una muestra cada intervalo a partir de la anterior
+        # programada. Un tick algo largo sólo atrasa la siguiente muestra; se
+        # pierden las que quedaron enteras atrás del cronograma.
+        proxima_muestra = ultima_muestra + self.intervalo_medicion_s
+        perdidas = 0
         while self._activo.is_set():
-            time.sleep(self.intervalo_medicion_s)
-            latencia_promedio, peticiones_activas = self.get_system_metrics()
+            self.reloj.sleep(max(0.0, proxima_muestra - self.reloj.time()))
+            ahora = self.reloj.time()
+            salteadas = int((ahora - proxima_muestra) // self.intervalo_medicion_s)
+            if salteadas:
+                logging.debug("Medidor: muestra atrasada %.1f ms, se saltean %d muestras.",
+                              (ahora - proxima_muestra) * 1000, salteadas)
+            perdidas += salteadas
+            proxima_muestra += (salteadas + 1) * self.intervalo_medicion_s
+            dt_s = ahora - ultima_muestra
+            ultima_muestra = ahora
+            latencia_promedio, peticiones_activas, latencias_por_clase = self.get_system_metrics()
             if latencia_promedio is None:
                 continue
 
-            error_s = self.latencia_deseada_s - latencia_promedio
+            error_s, setpoint_s = self.calcular_error(latencia_promedio, latencias_por_clase)
             peticiones_nuevas = self.manager.get_and_reset_nuevas_peticiones()
 
             # Guardamos datos en el collector (ms)
@@ -56,7 +122,9 @@ class Medidor:
                 peticiones_activas,
                 error_s,
                 peticiones_nuevas,
+                latencias_por_clase,
             )
+            self.data_collector.contabilidad.muestrear_utilizacion(dt_s)
 
             logging.info(
                 "Medidor: Latencia Promedio: %.2f ms. Error: %.2f ms.",
@@ -70,39 +138,102 @@ class Medidor:
                 latencia_promedio,
                 peticiones_activas,
                 len(self.manager.instancias),
-                self.latencia_deseada_s,
+                setpoint_s,
+                dt_s,
             )
 
+            self.data_collector.collect_tick(self.reloj.time() - ahora, perdidas)
+            perdidas = 0
+
+            if self.muestreo_adaptativo:
+                intervalo_anterior_s = self.intervalo_medicion_s
+                self.intervalo_medicion_s = self._siguiente_intervalo(error_s, peticiones_nuevas, dt_s)
+                # El cronograma sigue desde esta muestra con el nuevo intervalo.
+                proxima_muestra += self.intervalo_medicion_s - intervalo_anterior_s
+
+    def _siguiente_intervalo(self, error_s, peticiones_nuevas, dt_s):
+        """
+        Intervalo de la próxima medición en modo adaptativo: el mínimo si el error
+        suavizado cambia rápido o si las llegadas del último segundo se apartan
+        más de 3 desvíos (Poisson) de la tasa de largo plazo; si no, el actual
+        alargado por FACTOR_RELAJACION, sin superar el máximo.
+        """
+        if dt_s <= 0:
+            return self.intervalo_medicion_s
+        ahora = self.reloj.time()
+        self._llegadas_recientes.append((ahora, peticiones_nuevas))
+        self._llegadas_en_ventana += peticiones_nuevas
+        while self._llegadas_recientes[0][0] < ahora - self.VENTANA_LLEGADAS_S:
+            self._llegadas_en_ventana -= self._llegadas_recientes.popleft()[1]
+
+        if self._error_suavizado is None:
+            self._error_suavizado = error_s
+            self._tasa_llegadas_promedio = peticiones_nuevas / dt_s
+            return self.intervalo_medicion_s
+
+        error_anterior = self._error_suavizado
+        self._error_suavizado += min(1.0, dt_s / self.TAU_ERROR_S) * (error_s - self._error_suavizado)
+        derivada_error = abs(self._error_suavizado - error_anterior) / dt_s
+
+        esperadas = self._tasa_llegadas_promedio * self.VENTANA_LLEGADAS_S
+        cambio_tasa = abs(self._llegadas_en_ventana - esperadas) > 3 * math.sqrt(esperadas) + 1
+        self._tasa_llegadas_promedio += min(1.0, dt_s / self.TAU_TASA_S) * (
+            peticiones_nuevas / dt_s - self._tasa_llegadas_promedio)
+
+        if derivada_error > self.UMBRAL_DERIVADA_ERROR or cambio_tasa:
+            nuevo = self.intervalo_min_s
+        else:
+            nuevo = min(self.intervalo_max_s, self.intervalo_medicion_s * self.FACTOR_RELAJACION)
+        if nuevo != self.intervalo_medicion_s:
+            logging.debug("Medidor: intervalo de medicion %.3fs -> %.3fs.", self.intervalo_medicion_s, nuevo)
+        return nuevo
+
+    def calcular_error(self, latencia_promedio, latencias_por_clase):
+        """
+        Devuelve (error_s, setpoint_s). Sin setpoints por clase se controla la
+        latencia promedio global; con setpoints por clase se toma la clase con el
+        error más negativo (la que más excede su objetivo).
+        """
+        if not self.setpoints_por_clase_s:
+            return self.latencia_deseada_s - latencia_promedio, self.latencia_deseada_s
+
+        peor_error, peor_setpoint = None, None
+        for clase, setpoint_s in self.setpoints_por_clase_s.items():
+            error_clase = setpoint_s - latencias_por_clase.get(clase, 0.0)
+            if peor_error is None or error_clase < peor_error:
+                peor_error, peor_setpoint = error_clase, setpoint_s
+        return peor_error, peor_setpoint
+
     def get_system_metrics(self):
         """
         Calcula la latencia promedio de todas las peticiones (en proceso + en cola).
+        Devuelve (latencia_promedio_s, peticiones_activas, {clase: latencia_promedio_s}).
         """
-        tiempo_referencia = time.time() - self.sim_start_time
-        latencia_total = 0.0
-        peticiones_en_proceso = 0
+        tiempo_referencia = self.reloj.time() - self.sim_start_time
+        latencia_por_clase = {clase: 0.0 for clase in self.manager.clases}
+        peticiones_por_clase = {clase: 0 for clase in self.manager.clases}
 
         # 1. Medir latencia de peticiones en procesamiento
         for instancia in self.manager.instancias:
-            ocupado, arrival_time = instancia.get_datos_peticion_actual()
+            ocupado, arrival_time, clase = instancia.get_datos_peticion_actual()
             if ocupado and arrival_time is not None:
-                latencia_total += (tiempo_referencia - arrival_time)
-                peticiones_en_proceso += 1
+                latencia_por_clase[clase] += (tiempo_referencia - arrival_time)
+                peticiones_por_clase[clase] += 1
 
         # 2. Medir latencia de peticiones en cola
-        peticiones_en_cola = self.manager.get_peticiones_pendientes_snapshot()
-        # Durante el apagado, la cola puede contener un 'None' para detener el dispatcher.
-        # Lo filtramos para evitar un TypeError al desempaquetar.
-        for peticion in peticiones_en_cola:
-            if peticion is None:
-                continue
-            arrival_time, _ = peticion
-            if arrival_time is not None:
-                latencia_total += (tiempo_referencia - arrival_time)
+        for peticion in self.manager.get_peticiones_pendientes_snapshot():
+            latencia_por_clase[peticion.clase] += (tiempo_referencia - peticion.arrival_time)
+            peticiones_por_clase[peticion.clase] += 1
 
-        num_peticiones_activas = peticiones_en_proceso + len(peticiones_en_cola)
+        num_peticiones_activas = sum(peticiones_por_clase.values())
+        latencia_total = sum(latencia_por_clase.values())
+        latencias_promedio_por_clase = {
+            clase: (latencia_por_clase[clase] / n if n else 0.0)
+            for clase, n in peticiones_por_clase.items()
+        }
 
         if num_peticiones_activas == 0:
-            return 0.0, 0
+            return 0.0, 0, latencias_promedio_por_clase
 
         latencia_promedio = latencia_total / num_peticiones_activas
-        return latencia_promedio, num_peticiones_activas
\ No newline at end of file
+        return latencia_promedio, num_peticiones_activas, latencias_promedio_por_clase
\ No newline at end of file
@@ -0,0 +1,165 @@
+import sys
+import time
+import argparse
+import numpy as np
+from Controlador import Controlador
+
+# Escenario por defecto: la carga base de main.py con un ataque DoS en el medio.
+ESCENARIO_POR_DEFECTO = {
+    "duracion_s": 120.0,
+    "frecuencia_base_hz": 1.0,
+    "processing_s": 1.0,
+    "setpoint_s": 1.0,
+    "banda_s": 0.4,
+    "max_servers": 50,
+    "dos": {"inicio_s": 30.0, "duracion_s": 6.0, "frecuencia_hz": 8.0},
+}
+
+def simular_lote(n, Kp, Kd, deadband_s, intervalo_medicion_s, escenario=None,
+                 semilla=0, dt_s=0.01):
+    """
+    Simula `n` corridas independientes del lazo de control a la vez, con una
+    aproximación de colas fluida vectorizada en NumPy (una fila por corrida).
+
+    Modelo por paso de `dt_s` (segundos simulados):
+      - llegadas Poisson (carga base + DoS) que se suman a las peticiones en el sistema Q;
+      - N instancias completan min(Q, N) * dt / processing_s peticiones;
+      - como el Medidor, el sensor informa la edad promedio de las peticiones en
+        el sistema: se lleva la edad total A (crece Q * dt por paso) y las que
+        salen se llevan el doble de la edad promedio (en régimen, edades
+        uniformes entre 0 y el tiempo de respuesta);
+      - una petición que llega cumple el SLO si su tiempo de respuesta estimado
+        processing_s * max(1, Q / N) no supera setpoint + banda;
+      - cada `intervalo_medicion_s` se aplica la misma ley PD con banda muerta
+        que Controlador (derivada normalizada a su intervalo de referencia) y se
+        redondea la acción; no se destruyen instancias ocupadas.
+
+    Kp, Kd, deadband_s e intervalo_medicion_s pueden ser escalares o arrays de
+    largo `n` (para evaluar muchas configuraciones en un mismo lote).
+
+    :return: dict de arrays de largo `n`: slo_pct, instancias_pico,
+             asentamiento_s (tiempo desde el fin del DoS hasta que la latencia
+             medida queda por debajo de setpoint + banda; NaN si no se asienta)
+             e instancias_segundo.
+    """
+    esc = dict(ESCENARIO_POR_DEFECTO, **(escenario or {}))
+    dos = esc.get("dos")
+    rng = np.random.default_rng(semilla)
+
+    Kp = np.broadcast_to(np.asarray(Kp, dtype=np.float64), (n,))
+    Kd = np.broadcast_to(np.asarray(Kd, dtype=np.float64), (n,))
+    deadband = np.broadcast_to(np.asarray(deadband_s, dtype=np.float64), (n,))
+    pasos_por_muestra = np.maximum(1, np.rint(np.broadcast_to(
+        np.asarray(intervalo_medicion_s, dtype=np.float64), (n,)) / dt_s)).astype(np.int64)
+    normalizacion_derivada = Controlador.INTERVALO_REFERENCIA_S / (pasos_por_muestra * dt_s)
+
+    proc = esc["processing_s"]
+    setpoint = esc["setpoint_s"]
+    umbral_slo = setpoint + esc["banda_s"]
+    num_pasos = int(round(esc["duracion_s"] / dt_s))
+    paso_fin_dos = int(round((dos["inicio_s"] + dos["duracion_s"]) / dt_s)) if dos else 0
+
+    Q = np.zeros(n)                   # peticiones en el sistema (cola + en proceso)
+    A = np.zeros(n)                   # edad total de las peticiones en el sistema (s)
+    N = np.ones(n)                    # instancias activas
+    error_previo = np.zeros(n)
+    llegadas_total = np.zeros(n)
+    llegadas_en_slo = np.zeros(n)
+    instancias_segundo = np.zeros(n)
+    instancias_pico = np.ones(n)
+    ultimo_paso_fuera_de_banda = np.full(n, paso_fin_dos - 1)
+
+    for paso in range(num_pasos):
+        t = paso * dt_s
+        tasa = esc["frecuencia_base_hz"]
+        if dos and dos["inicio_s"] <= t < dos["inicio_s"] + dos["duracion_s"]:
+            tasa += dos["frecuencia_hz"]
+        llegadas = rng.poisson(tasa * dt_s, size=n)
+
+        Q += llegadas
+        respuesta = proc * np.maximum(1.0, Q / N)
+        llegadas_total += llegadas
+        llegadas_en_slo += llegadas * (respuesta <= umbral_slo)
+
+        A += Q * dt_s
+        salidas = np.minimum(Q, N) * dt_s / proc
+        con_peticiones = Q > 1e-9
+        fraccion_salida = np.divide(2.0 * salidas, Q, out=np.zeros(n), where=con_peticiones)
+        A = np.maximum(0.0, A * (1.0 - fraccion_salida))
+        Q = np.maximum(0.0, Q - salidas)
+        latencia = np.divide(A, Q, out=np.zeros(n), where=Q > 1e-9)
+
+        instancias_segundo += N * dt_s
+        if paso >= paso_fin_dos:
+            fuera = latencia > umbral_slo
+            ultimo_paso_fuera_de_banda = np.where(fuera, paso, ultimo_paso_fuera_de_banda)
+
+        # Controlador PD, sólo en las corridas que muestrean en este paso.
+        muestrea = paso % pasos_por_muestra == 0
+        if muestrea.any():
+            error = setpoint - latencia
+            accion_p = np.where(np.abs(error) > deadband, -Kp * error, 0.0)
+            accion_d = -Kd * (error - error_previo) * normalizacion_derivada
+            accion = np.rint(accion_p + accion_d)
+            ocupadas = np.ceil(np.minimum(Q, N))
+            objetivo = np.clip(N + accion, 1, esc["max_servers"])
+            objetivo = np.where(accion < 0, np.maximum(objetivo, np.minimum(N, ocupadas)), objetivo)
+            N = np.where(muestrea, objetivo, N)
+            error_previo = np.where(muestrea, error, error_previo)
+            instancias_pico = np.maximum(instancias_pico, N)
+
+    slo_pct = 100.0 * llegadas_en_slo / np.maximum(llegadas_total, 1)
+    asentamiento = (ultimo_paso_fuera_de_banda + 1) * dt_s - paso_fin_dos * dt_s
+    asentamiento = np.where(ultimo_paso_fuera_de_banda >= num_pasos - 1, np.nan, asentamiento)
+    return {
+        "slo_pct": slo_pct,
+        "instancias_pico": instancias_pico,
+        "asentamiento_s": asentamiento,
+        "instancias_segundo": instancias_segundo,
+    }
+
+def costo(slo_pct, instancias_segundo, peso_instancias=0.01):
+    """Costo escalar de una corrida: % de violación de SLO + costo ponderado de la flota."""
+    return (100.0 - slo_pct) + peso_instancias * instancias_segundo
+
+def intervalo_confianza(valores, z=1.96):
+    """Media e intervalo de confianza normal (95% por defecto), ignorando NaN."""
+    validos = valores[~np.isnan(valores)]
+    if validos.size == 0:
+        return float("nan"), float("nan"), 0
+    media = float(validos.mean())
+    semiancho = z * float(validos.std(ddof=1)) / np.sqrt(validos.size) if validos.size > 1 else 0.0
+    return media, semiancho, int(validos.size)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Corridas Monte-Carlo (modelo fluido vectorizado) de un escenario y controlador.")
+    parser.add_argument("--semillas", type=int, default=500, help="Cantidad de corridas. Por defecto 500.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla base del generador aleatorio.")
+    parser.add_argument("--Kp", type=float, default=0.8)
+    parser.add_argument("--Kd", type=float, default=7.0)
+    parser.add_argument("--deadband", type=float, default=0.0, help="Banda muerta del controlador (s).")
+    parser.add_argument("--muestreo-hz", type=float, default=50.0, help="Frecuencia de muestreo del Medidor.")
+    parser.add_argument("--dt", type=float, default=0.01, help="Paso de integración (s simulados).")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    resultados = simular_lote(
+        args.semillas, args.Kp, args.Kd, args.deadband, 1.0 / args.muestreo_hz,
+        semilla=args.semilla, dt_s=args.dt,
+    )
+    transcurrido = time.perf_counter() - inicio
+
+    print(f"{args.semillas} corridas de {ESCENARIO_POR_DEFECTO['duracion_s']:.0f}s simulados "
+          f"en {transcurrido:.1f}s (Kp={args.Kp}, Kd={args.Kd}, deadband={args.deadband}, "
+          f"muestreo={args.muestreo_hz} Hz)")
+    for metrica in ("slo_pct", "instancias_pico", "asentamiento_s", "instancias_segundo"):
+        media, semiancho, validas = intervalo_confianza(resultados[metrica])
+        print(f"  {metrica:20s} {media:10.3f} ± {semiancho:.3f} (IC 95%, n={validas})")
+    no_asentadas = int(np.isnan(resultados["asentamiento_s"]).sum())
+    if no_asentadas:
+        print(f"  {no_asentadas} corridas no se asentaron tras el DoS.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
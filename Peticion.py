@@ -0,0 +1,22 @@
+from collections import namedtuple
+
+# Clases de peticiones en orden de prioridad (la primera es la más prioritaria),
+# con el peso que reciben bajo la política de despacho ponderada.
+CLASES_POR_DEFECTO = {
+    "premium": 4,
+    "estandar": 1,
+}
+CLASE_POR_DEFECTO = "estandar"
+
+# Petición encolada en el SystemManager:
+#   arrival_time: segundos desde el inicio de la simulación.
+#   processing_time: segundos de procesamiento requeridos.
+#   clase: clase de servicio a la que pertenece la petición.
+#   al_finalizar: callable opcional que la Instancia invoca con la latencia
+#                 total (s) al terminar de procesarla, o con None si la
+#                 instancia cayó antes de terminarla (ej. ServidorHTTP).
+Peticion = namedtuple(
+    "Peticion",
+    ["arrival_time", "processing_time", "clase", "al_finalizar"],
+    defaults=[CLASE_POR_DEFECTO, None],
+)
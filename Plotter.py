@@ -1,6 +1,5 @@
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.ticker import MaxNLocator
 from matplotlib.widgets import TextBox, Button, Slider
 import logging
@@ -74,7 +73,8 @@ class Plotter:
         self.ax5.yaxis.set_major_locator(MaxNLocator(integer=True))
 
         # Ajustar layout para dejar espacio para los controles en la parte superior
-        self.fig.subplots_adjust(left=0.08, right=0.95, top=0.82, bottom=0.05, hspace=0.5)
+        # (las etiquetas llegan hasta y=0.79).
+        self.fig.subplots_adjust(left=0.08, right=0.95, top=0.76, bottom=0.05, hspace=0.5)
 
         # --- Controles interactivos (en la parte superior) ---
 
@@ -112,20 +112,30 @@ class Plotter:
         self.slo_band_text_obj = self.fig.text(0.25, 0.88, f"SLO Lat. Máx: {umbral_max_slo:.1f}s", fontsize=10, transform=self.fig.transFigure)
 
         self.slo_text = self.fig.text(0.25, 0.85, "SLO (1 min): --%", fontsize=10, transform=self.fig.transFigure)
+        self.slo_clase = self.cliente.clase_base
+        self.slo_clase_text = self.fig.text(0.25, 0.82, f"SLO {self.slo_clase} (1 min): --%", fontsize=10, transform=self.fig.transFigure)
         self.fig.text(0.05, 0.82, f"Banda Muerta Ctr: ±{controlador.deadband_s}s", fontsize=10, transform=self.fig.transFigure)
+        # Costo y eficiencia de la flota
+        self.costo_text = self.fig.text(0.05, 0.79, "Inst·s: --  Utilización: --%  Altas/Bajas: --", fontsize=10, transform=self.fig.transFigure)
 
 
-        # Slider para frecuencia de muestreo (Hz)
-        slider_muestreo_ax = self.fig.add_axes([0.55, 0.95, 0.40, 0.02])
-        self.muestreo_slider = Slider(
-            ax=slider_muestreo_ax,
-            label='Frecuencia Muestreo (Hz)',
-            valmin=1,  # 1 Hz (1000 ms)
-            valmax=100, # 100 Hz (10 ms)
-            valinit=1 / self.medidor.intervalo_medicion_s,
-            valstep=1,
-        )
-        self.muestreo_slider.on_changed(self._on_muestreo_change)
+        # Slider para frecuencia de muestreo (Hz). Con muestreo adaptativo el
+        # Medidor elige el intervalo: sólo se muestra la frecuencia actual.
+        self.muestreo_slider = None
+        self.muestreo_text = None
+        if self.medidor.muestreo_adaptativo:
+            self.muestreo_text = self.fig.text(0.55, 0.95, "", fontsize=10, transform=self.fig.transFigure)
+        else:
+            slider_muestreo_ax = self.fig.add_axes([0.55, 0.95, 0.40, 0.02])
+            self.muestreo_slider = Slider(
+                ax=slider_muestreo_ax,
+                label='Frecuencia Muestreo (Hz)',
+                valmin=1,  # 1 Hz (1000 ms)
+                valmax=100, # 100 Hz (10 ms)
+                valinit=1 / self.medidor.intervalo_medicion_s,
+                valstep=1,
+            )
+            self.muestreo_slider.on_changed(self._on_muestreo_change)
 
         # --- Controles de Ataque DoS en una línea ---
 
@@ -165,12 +175,17 @@ class Plotter:
             self.text_box.set_val(f"{self.latencia_deseada_s:.2f}") # Revertir
             return
 
-        self.latencia_deseada_s = nuevo_sp_s
         self.medidor.latencia_deseada_s = nuevo_sp_s
 
         # --- SOLUCIÓN: Sincronizar el cliente con el nuevo setpoint ---
         self.cliente.base_processing_ms = int(nuevo_sp_s * 1000)
 
+        self._mostrar_setpoint(nuevo_sp_s)
+        logging.info("Nuevo setpoint establecido: %.3f s.", nuevo_sp_s)
+
+    def _mostrar_setpoint(self, nuevo_sp_s):
+        """Actualiza la línea de referencia y la etiqueta de SLO con un nuevo setpoint."""
+        self.latencia_deseada_s = nuevo_sp_s
         self.setpoint_line.set_ydata([nuevo_sp_s, nuevo_sp_s])
         self.setpoint_line.set_label(f'Latencia Deseada ({nuevo_sp_s:.2f}s)')
         self.ax1.legend(loc="upper right")
@@ -179,8 +194,6 @@ class Plotter:
         umbral_max_slo = self.latencia_deseada_s + self.error_band_s
         self.slo_band_text_obj.set_text(f"SLO Lat. Máx: {umbral_max_slo:.1f}s")
 
-        logging.info("Nuevo setpoint establecido: %.3f s.", nuevo_sp_s)
-
     def _on_dos_click(self, event):
         logging.info("Disparando ataque DoS con Duracion=%.1fs y Frecuencia=%.1f RPS",
                      self.dos_duracion_s, self.dos_frecuencia_hz)
@@ -209,13 +222,15 @@ class Plotter:
         try:
             nuevo_max = int(text)
             manager = self.medidor.manager
-            num_actual = len(manager.instancias)
 
-            if nuevo_max < manager.MIN_SERVERS or nuevo_max < num_actual:
-                raise ValueError(f"Debe ser >= {max(manager.MIN_SERVERS, num_actual)}")
+            if nuevo_max < manager.MIN_SERVERS:
+                raise ValueError(f"Debe ser >= {manager.MIN_SERVERS}")
 
-            manager.max_servers = nuevo_max
-            logging.info("Nuevo maximo de instancias establecido: %d", nuevo_max)
+            # Si hay más instancias que el nuevo máximo, el reconciliador
+            # destruye las sobrantes a medida que se liberan.
+            if nuevo_max != manager.max_servers:
+                manager.set_max_servers(nuevo_max)
+                logging.info("Nuevo maximo de instancias establecido: %d", nuevo_max)
 
         except ValueError as e:
             logging.warning("Valor de max_instancias invalido: %s", e)
@@ -283,6 +298,12 @@ class Plotter:
                     ax.relim()
                     ax.autoscale_y()
 
+        # Cambios hechos por un Escenario (no desde los controles de la ventana).
+        if self.medidor.latencia_deseada_s != self.latencia_deseada_s:
+            self._mostrar_setpoint(self.medidor.latencia_deseada_s)
+        if self.max_inst_textbox.text != str(self.medidor.manager.max_servers):
+            self.max_inst_textbox.set_val(f"{self.medidor.manager.max_servers}")
+
         # Actualizar texto de SLO
         slo_compliance = self.data_collector.get_slo_compliance(
             window_seconds=60,
@@ -290,6 +311,25 @@ class Plotter:
             error_band_s=self.error_band_s
         )
         self.slo_text.set_text(f"SLO (1 min): {slo_compliance:.1f}%")
+        slo_clase = self.data_collector.get_slo_compliance(
+            window_seconds=60,
+            # Con setpoint propio (--setpoint-clase) la clase se mide contra él.
+            setpoint_s=self.medidor.setpoints_por_clase_s.get(self.slo_clase, self.latencia_deseada_s),
+            error_band_s=self.error_band_s,
+            clase=self.slo_clase,
+        )
+        self.slo_clase_text.set_text(f"SLO {self.slo_clase} (1 min): {slo_clase:.1f}%")
+
+        costo = self.data_collector.contabilidad.resumen()
+        self.costo_text.set_text(
+            f"Inst·s: {costo['instancia_segundos']:.0f}  Utilización: {costo['utilizacion_pct']:.1f}%  "
+            f"Altas/Bajas: {costo['altas']}/{costo['bajas']} ({costo['reversiones']} reversiones)"
+        )
+        if self.muestreo_text is not None:
+            self.muestreo_text.set_text(
+                f"Muestreo adaptativo: {1 / self.medidor.intervalo_medicion_s:.1f} Hz "
+                f"(entre {1 / self.medidor.intervalo_max_s:.0f} y {1 / self.medidor.intervalo_min_s:.0f} Hz)"
+            )
 
         return self.line1, self.line2, self.line3, self.line4, self.line5
 
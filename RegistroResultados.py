@@ -0,0 +1,162 @@
+import os
+import json
+import shutil
+import logging
+import threading
+import zipfile
+import numpy as np
+
+# Columnas de la serie temporal: nombre en el archivo -> atributo del DataCollector.
+COLUMNAS_SERIE = {
+    "t": "timestamps",
+    "latencia_promedio": "latencias_promedio",
+    "instancias": "cantidad_instancias",
+    "peticiones_activas": "peticiones_activas",
+    "error": "errores",
+    "peticiones_nuevas": "peticiones_nuevas",
+}
+
+# Sufijo del directorio con los bloques de una corrida en curso (o cortada).
+SUFIJO_PARCIAL = ".parcial"
+
+class RegistroResultados:
+    """
+    Persiste los resultados de una corrida en un archivo `.npz` (zip de arrays
+    de NumPy comprimidos), escribiendo por bloques mientras la simulación avanza.
+
+    Durante la corrida cada bloque se guarda como un `.npz` propio en el
+    directorio `<ruta>.parcial/` (escrito en un temporal y renombrado con
+    `os.replace`), junto con `meta.json`. Al detener, los bloques se consolidan
+    en `<ruta>` y el directorio se borra. Si la corrida se corta, `<ruta>.parcial/`
+    queda con todos los bloques completos y `Analisis.cargar_corrida` lo lee
+    igual: sólo se pierde el último intervalo.
+
+    En el archivo consolidado, cada bloque aporta por columna un miembro
+    `<columna>.<n>.npy` con las filas nuevas desde el bloque anterior;
+    `Analisis.cargar_corrida` concatena los bloques. Columnas:
+      - serie temporal (una fila por muestra del Medidor): ver COLUMNAS_SERIE,
+        más `latencia_<clase>` por cada clase de petición.
+      - peticiones resueltas: `req_t`, `req_latencia`, `req_clase` (índice en
+        `meta["clases"]`).
+      - `meta`: JSON con la configuración de la corrida; al cerrar con un
+        resumen se agrega `meta_final` con el resumen de la corrida.
+    """
+
+    def __init__(self, ruta, data_collector, intervalo_s=10.0, meta=None):
+        """
+        :param ruta: archivo .npz de salida (se sobrescribe).
+        :param data_collector: origen de los datos.
+        :param intervalo_s: segundos simulados entre bloques.
+        :param meta: dict con la configuración de la corrida (se guarda como JSON).
+                     Debe incluir "clases": la lista de clases de petición.
+                     Se le agregan "costo_al_inicio" y, si los buffers ya tenían
+                     datos (snapshot restaurado), "t_inicio_registro_s".
+        """
+        self.ruta = ruta
+        self.dir_bloques = ruta + SUFIJO_PARCIAL
+        self.data_collector = data_collector
+        self.intervalo_s = intervalo_s
+        self.reloj = data_collector.reloj
+        self.meta = dict(meta or {})
+        self._indice_clase = {clase: i for i, clase in enumerate(self.meta["clases"])}
+        # Al retomar un snapshot los buffers ya traen el calentamiento: se
+        # registra sólo lo que ocurre desde ahora, para que las ramas que
+        # parten del mismo snapshot se comparen sin mezclar el tramo común.
+        with data_collector.lock:
+            self._filas_serie = len(data_collector.timestamps)
+            self._filas_peticiones = len(data_collector.peticiones_resueltas)
+            if self._filas_serie:
+                self.meta["t_inicio_registro_s"] = data_collector.timestamps[-1]
+        # Acumulados de costo al empezar, para que el resumen informe sólo este tramo.
+        self.meta["costo_al_inicio"] = data_collector.contabilidad.resumen()
+        self._bloque = 0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._thread = threading.Thread(target=self._bucle_escritura, name="RegistroResultados", daemon=True)
+
+        shutil.rmtree(self.dir_bloques, ignore_errors=True)
+        os.makedirs(self.dir_bloques)
+        self._escribir_atomico(os.path.join(self.dir_bloques, "meta.json"),
+                               lambda archivo: archivo.write(json.dumps(self.meta).encode("utf-8")))
+
+    def iniciar(self):
+        self._thread.start()
+
+    def detener(self, resumen=None):
+        """
+        Escribe el último bloque y consolida la corrida en `ruta`, con un
+        resumen final opcional (se agrega a `meta` bajo la clave "resumen").
+        """
+        self._detener.set()
+        self._thread.join()
+        self.escribir_bloque()
+        self._consolidar(resumen)
+        logging.info("RegistroResultados: corrida guardada en %s (%d bloques).", self.ruta, self._bloque)
+
+    def _consolidar(self, resumen):
+        def escribir(destino):
+            with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as archivo:
+                self._escribir_array(archivo, "meta.npy", np.array(json.dumps(self.meta)))
+                for bloque in range(self._bloque):
+                    with np.load(self._ruta_bloque(bloque), allow_pickle=False) as datos:
+                        for nombre in datos.files:
+                            self._escribir_array(archivo, f"{nombre}.{bloque:05d}.npy", datos[nombre])
+                if resumen is not None:
+                    meta_final = dict(self.meta, resumen=resumen)
+                    self._escribir_array(archivo, "meta_final.npy", np.array(json.dumps(meta_final)))
+
+        self._escribir_atomico(self.ruta, escribir)
+        shutil.rmtree(self.dir_bloques, ignore_errors=True)
+
+    def _bucle_escritura(self):
+        while not self._detener.wait(self.reloj.a_segundos_reales(self.intervalo_s)):
+            self.escribir_bloque()
+
+    def escribir_bloque(self):
+        """Escribe un bloque con las filas nuevas desde el bloque anterior."""
+        with self._lock:
+            dc = self.data_collector
+            with dc.lock:
+                serie = {
+                    columna: list(getattr(dc, atributo)[self._filas_serie:])
+                    for columna, atributo in COLUMNAS_SERIE.items()
+                }
+                n_serie = len(serie["t"])
+                for clase, valores in dc.latencias_por_clase.items():
+                    serie[f"latencia_{clase}"] = list(valores[self._filas_serie:self._filas_serie + n_serie])
+                resueltas = dc.peticiones_resueltas[self._filas_peticiones:]
+
+            if n_serie == 0 and not resueltas:
+                return
+
+            columnas = {nombre: np.asarray(valores, dtype=np.float64) for nombre, valores in serie.items()}
+            columnas["req_t"] = np.fromiter((p[0] for p in resueltas), dtype=np.float64, count=len(resueltas))
+            columnas["req_latencia"] = np.fromiter((p[1] for p in resueltas), dtype=np.float64, count=len(resueltas))
+            columnas["req_clase"] = np.fromiter((self._indice_clase[p[2]] for p in resueltas), dtype=np.int16, count=len(resueltas))
+
+            self._escribir_atomico(self._ruta_bloque(self._bloque),
+                                   lambda archivo: np.savez_compressed(archivo, **columnas))
+
+            self._filas_serie += n_serie
+            self._filas_peticiones += len(resueltas)
+            self._bloque += 1
+
+    def _ruta_bloque(self, bloque):
+        return os.path.join(self.dir_bloques, f"bloque.{bloque:05d}.npz")
+
+    @staticmethod
+    def _escribir_atomico(ruta, escribir):
+        """
+        Escribe `ruta` en un temporal y lo renombra con `os.replace`, de modo
+        que un corte nunca deja el archivo a medio escribir.
+        :param escribir: callable que recibe el archivo temporal abierto en binario.
+        """
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as archivo:
+            escribir(archivo)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _escribir_array(archivo, nombre, valores):
+        with archivo.open(nombre, "w") as miembro:
+            np.lib.format.write_array(miembro, np.asanyarray(valores), allow_pickle=False)
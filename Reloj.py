@@ -0,0 +1,36 @@
+import time
+
+class Reloj:
+    """
+    Reloj único de la simulación, con factor de aceleración.
+
+    Todos los componentes miden el tiempo con `reloj.time()` y esperan con
+    `reloj.sleep()`. Los tiempos (setpoints, procesamiento, intervalos de
+    muestreo) se expresan siempre en segundos simulados; con `factor=10` un
+    segundo simulado dura 0.1 s reales.
+    """
+
+    def __init__(self, factor=1.0):
+        """
+        :param factor: cuántos segundos simulados transcurren por segundo real.
+        """
+        if factor <= 0:
+            raise ValueError("El factor de aceleracion debe ser mayor que 0.")
+        self.factor = factor
+        self._origen = time.time()
+
+    def time(self):
+        """Tiempo simulado actual (segundos, misma época que time.time())."""
+        return self._origen + (time.time() - self._origen) * self.factor
+
+    def sleep(self, segundos):
+        """Duerme `segundos` simulados."""
+        if segundos > 0:
+            time.sleep(segundos / self.factor)
+
+    def a_segundos_reales(self, segundos):
+        """Convierte una duración simulada a segundos reales."""
+        return segundos / self.factor
+
+# Reloj de tiempo real compartido por defecto (factor 1).
+RELOJ_REAL = Reloj()
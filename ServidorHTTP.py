@@ -0,0 +1,209 @@
+import asyncio
+import json
+import math
+import logging
+import threading
+from urllib.parse import urlsplit, parse_qs
+from Peticion import CLASE_POR_DEFECTO
+
+class ServidorHTTP:
+    """
+    Front end HTTP/1.1 (asyncio) opcional para alimentar la simulación con
+    generadores de carga reales (wrk, ab, hey...).
+
+    Cada petición `GET /peticion?proc_ms=1000&clase=premium` se convierte en un
+    `SystemManager.receive_request`; la conexión queda abierta hasta que una
+    Instancia termina de procesarla y se responde con la latencia medida en JSON.
+    Las conexiones son keep-alive por defecto (HTTP/1.1), de modo que un mismo
+    socket se reutiliza para muchas peticiones.
+    """
+    RUTAS = ("/", "/peticion")
+    MAX_LINEA = 8192
+
+    def __init__(self, manager, host="127.0.0.1", puerto=8080,
+                 processing_ms=1000, clase=CLASE_POR_DEFECTO, backlog=4096):
+        """
+        :param manager: SystemManager que recibe las peticiones.
+        :param host: dirección en la que escuchar.
+        :param puerto: puerto TCP.
+        :param processing_ms: tiempo de procesamiento por defecto si la petición no indica `proc_ms`.
+        :param clase: clase de servicio por defecto si la petición no indica `clase`.
+        :param backlog: tamaño de la cola de conexiones pendientes del socket.
+        """
+        self.manager = manager
+        self.host = host
+        self.puerto = puerto
+        self.processing_ms = processing_ms
+        self.clase = clase
+        self.backlog = backlog
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._listo = threading.Event()
+
+    def iniciar(self):
+        """Inicia el servidor en un hilo propio con su event loop."""
+        self._thread = threading.Thread(target=self._correr_loop, name="ServidorHTTP", daemon=True)
+        self._thread.start()
+        self._listo.wait()
+        logging.info("ServidorHTTP: escuchando en http://%s:%d/peticion", self.host, self.puerto)
+
+    def detener(self):
+        """Cierra el socket de escucha y detiene el event loop."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+        logging.info("ServidorHTTP: detenido.")
+
+    def _correr_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(
+            self._atender_conexion, self.host, self.puerto,
+            backlog=self.backlog, limit=self.MAX_LINEA,
+        ))
+        self._listo.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            # No esperamos wait_closed(): las conexiones retenidas en espera de
+            # una Instancia no deben bloquear el apagado. Las cancelamos.
+            self._server.close()
+            pendientes = asyncio.all_tasks(self._loop)
+            for tarea in pendientes:
+                tarea.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pendientes, return_exceptions=True))
+            self._loop.close()
+
+    async def _atender_conexion(self, reader, writer):
+        """Atiende peticiones sucesivas sobre una misma conexión (keep-alive)."""
+        try:
+            while True:
+                try:
+                    peticion = await self._leer_peticion(reader)
+                except _PeticionInvalida as error:
+                    # Tras un error de framing la conexión queda desincronizada: se cierra.
+                    await self._responder(writer, error.estado, {"error": error.mensaje}, False)
+                    break
+                if peticion is None:
+                    break
+                metodo, objetivo, keep_alive = peticion
+
+                estado, cuerpo = await self._procesar(metodo, objetivo)
+                await self._responder(writer, estado, cuerpo, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # CancelledError: apagado del servidor con la conexión abierta.
+            pass
+        finally:
+            writer.close()
+
+    async def _leer_peticion(self, reader):
+        """
+        Lee la línea de petición, los headers y descarta el cuerpo. Devuelve
+        (metodo, objetivo, keep_alive), o None si el cliente cerró la conexión.
+        :raises _PeticionInvalida: si la petición está mal formada o excede MAX_LINEA.
+        """
+        # StreamReader.readline convierte LimitOverrunError en ValueError.
+        try:
+            linea = await reader.readline()
+        except ValueError:
+            raise _PeticionInvalida(414, "linea de peticion demasiado larga")
+        if not linea:
+            return None
+        try:
+            metodo, objetivo, version = linea.decode("latin-1").split()
+        except ValueError:
+            raise _PeticionInvalida(400, "linea de peticion invalida")
+
+        headers = {}
+        while True:
+            try:
+                linea_header = await reader.readline()
+            except ValueError:
+                raise _PeticionInvalida(431, "header demasiado largo")
+            if linea_header in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea_header.decode("latin-1").partition(":")
+            headers[nombre.strip().lower()] = valor.strip()
+
+        # Descartamos el cuerpo (si lo hay) para no desincronizar la conexión.
+        try:
+            largo_cuerpo = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise _PeticionInvalida(400, "content-length invalido")
+        if largo_cuerpo < 0:
+            raise _PeticionInvalida(400, "content-length invalido")
+        if largo_cuerpo:
+            await reader.readexactly(largo_cuerpo)
+
+        conexion = headers.get("connection", "").lower()
+        keep_alive = conexion == "keep-alive" if version == "HTTP/1.0" else conexion != "close"
+        return metodo, objetivo, keep_alive
+
+    async def _procesar(self, metodo, objetivo):
+        """Encola la petición en el SystemManager y espera a que una Instancia la resuelva."""
+        url = urlsplit(objetivo)
+        if metodo not in ("GET", "POST"):
+            return 405, {"error": "metodo no soportado"}
+        if url.path not in self.RUTAS:
+            return 404, {"error": "ruta inexistente"}
+
+        parametros = parse_qs(url.query)
+        try:
+            processing_s = float(parametros.get("proc_ms", [self.processing_ms])[0]) / 1000.0
+        except ValueError:
+            return 400, {"error": "proc_ms invalido"}
+        if not math.isfinite(processing_s):
+            return 400, {"error": "proc_ms invalido"}
+        clase = parametros.get("clase", [self.clase])[0]
+        if clase not in self.manager.clases or processing_s < 0:
+            return 400, {"error": "parametros invalidos"}
+
+        loop = asyncio.get_running_loop()
+        resultado = loop.create_future()
+
+        def _al_finalizar(latencia_s):
+            # Se invoca desde el hilo de la Instancia: volvemos al event loop.
+            try:
+                loop.call_soon_threadsafe(_resolver, latencia_s)
+            except RuntimeError:
+                pass  # El loop ya se cerró (apagado del servidor)
+
+        def _resolver(latencia_s):
+            if not resultado.done():
+                resultado.set_result(latencia_s)
+
+        arrival_time = self.manager.reloj.time() - self.manager.data_collector.start_time
+        self.manager.receive_request(arrival_time, processing_s, clase, _al_finalizar)
+        latencia_s = await resultado
+        if latencia_s is None:
+            # La instancia que la procesaba cayó (ver SystemManager.fallar_instancias).
+            return 503, {"error": "instancia caida", "clase": clase}
+        return 200, {"latencia_s": round(latencia_s, 6), "clase": clase}
+
+    @staticmethod
+    async def _responder(writer, estado, cuerpo, keep_alive):
+        razones = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   414: "URI Too Long", 431: "Request Header Fields Too Large",
+                   503: "Service Unavailable"}
+        datos = json.dumps(cuerpo).encode()
+        cabecera = (
+            f"HTTP/1.1 {estado} {razones[estado]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(datos)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode()
+        writer.write(cabecera + datos)
+        await writer.drain()
+
+class _PeticionInvalida(Exception):
+    """Petición HTTP mal formada: se responde con `estado` y se cierra la conexión."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
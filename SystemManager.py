@@ -1,82 +1,255 @@
 import logging
 import threading
-import queue
 import math
+from collections import deque
 from Instancia import Instancia
+from Reloj import RELOJ_REAL
+from Peticion import Peticion, CLASES_POR_DEFECTO, CLASE_POR_DEFECTO
 
 class SystemManager:
     """
     Gestiona instancias de procesamiento y distribuye las peticiones.
+    Cada clase de petición tiene su propia cola; el despachador elige de qué
+    cola tomar la siguiente petición según la política configurada:
+      - "estricta": siempre la clase más prioritaria con peticiones pendientes.
+      - "ponderada": round-robin ponderado (suave) según el peso de cada clase.
+
+    El escalado es asíncrono: `scale` sólo fija una cantidad objetivo de
+    instancias y un hilo reconciliador las crea o destruye por lotes en segundo
+    plano, de modo que el tick del controlador nunca se bloquea actuando.
     """
     MIN_SERVERS = 1
+    POLITICAS = ("estricta", "ponderada")
 
-    def __init__(self, data_collector, max_servers = 50):
-        self.peticiones_pendientes = queue.Queue()
+    def __init__(self, data_collector, max_servers = 50, clases=None, politica="ponderada",
+                 ejecutor=None, reloj=None):
+        """
+        :param data_collector: registro de datos de la simulación.
+        :param max_servers: límite superior de instancias.
+        :param clases: dict {clase: peso} en orden de prioridad (la primera es la más prioritaria).
+        :param politica: "estricta" o "ponderada".
+        :param ejecutor: EjecutorCPU opcional; si se indica, las instancias hacen trabajo de CPU real.
+        :param reloj: Reloj de la simulación, compartido con las instancias.
+        """
+        if politica not in self.POLITICAS:
+            raise ValueError(f"Politica de despacho invalida: {politica}")
+        self.clases = dict(clases) if clases else dict(CLASES_POR_DEFECTO)
+        self.politica = politica
+        self.colas_por_clase = {clase: deque() for clase in self.clases}
+        self._credito_por_clase = {clase: 0 for clase in self.clases}
         self.instancias = []
         self.data_collector = data_collector
+        self.ejecutor = ejecutor
+        self.reloj = reloj or RELOJ_REAL
         self.max_servers = max_servers  # Límite superior de instancias, ahora configurable
         self.cola_lock = threading.Lock()
         self.peticiones_nuevas_sem = threading.Semaphore(0)
         self.instancias_libres_sem = threading.Semaphore(0)
         self.next_instance_id = 0
+        # Protege la lista de instancias frente al despachador y al reconciliador.
+        self.instancias_lock = threading.Lock()
+        self.instancias_objetivo = 0
+        self._objetivo_lock = threading.Lock()
+        self._reconciliar = threading.Event()
         self._activo = threading.Event()
         self._activo.set()
         self._peticiones_nuevas_contador = 0
         self._contador_lock = threading.Lock()
+        # Corte consistente para los snapshots: mientras se toma, ninguna
+        # Instancia puede pasar una petición de "en curso" a "resuelta".
+        self.corte_lock = threading.Lock()
+        # Contadores acumulados (protegidos por cola_lock): peticiones recibidas
+        # por clase y peticiones descartadas sin procesar.
+        self.peticiones_recibidas = {clase: 0 for clase in self.clases}
+        self.peticiones_descartadas = 0
         self._dispatcher_thread = threading.Thread(target=self._bucle_despachador, daemon=True)
         self._dispatcher_thread.start()
+        self._reconciliador_thread = threading.Thread(
+            target=self._bucle_reconciliador, name="Reconciliador", daemon=True)
+        self._reconciliador_thread.start()
 
     def create_instance(self):
-        instance_id = self.next_instance_id
-        logging.info("Manager: Creando instancia %s...", instance_id)
-        nueva_instancia = Instancia(id_instancia=instance_id, semaforo=self.instancias_libres_sem, data_collector=self.data_collector)
-        nueva_instancia.iniciar()
-        self.instancias.append(nueva_instancia)
-        # nueva instancia libre:
-        self.instancias_libres_sem.release()
-        self.next_instance_id += 1
-        logging.info("Manager: Instancia %s creada y añadida al pool. Total: %d.",
-                     instance_id, len(self.instancias))
+        """
+        Crea una instancia de forma sincrónica (arranque y restauración de
+        snapshots). No cuenta como acción de escalado en la Contabilidad.
+        """
+        nueva_instancia, = self._crear_instancias(1, escalado=False)
+        self.instancias_objetivo = len(self.instancias)
         return nueva_instancia
 
     def destroy_instance(self):
-        if len(self.instancias) <= self.MIN_SERVERS:
-            logging.warning(
-                "Manager: intento de desescalado por debajo del minimo (%d instancias). Accion cancelada.",
-                self.MIN_SERVERS,
-            )
-            return
+        """
+        Destruye una instancia libre de forma sincrónica, si la hay. No cuenta
+        como acción de escalado en la Contabilidad.
+        """
+        self._destruir_instancias(1, escalado=False)
+        self.instancias_objetivo = len(self.instancias)
+
+    def _crear_instancias(self, cantidad, escalado=True):
+        """
+        Crea y arranca `cantidad` instancias en lote: primero se arrancan todos los
+        hilos y recién después se agregan al pool de una sola vez.
+        :param escalado: la decidió el reconciliador (cuenta como lote y churn).
+        """
+        nuevas = []
+        for _ in range(cantidad):
+            nuevas.append(Instancia(id_instancia=self.next_instance_id, semaforo=self.instancias_libres_sem,
+                                    data_collector=self.data_collector, ejecutor=self.ejecutor,
+                                    reloj=self.reloj, al_liberarse=self._instancia_liberada,
+                                    corte_lock=self.corte_lock))
+            self.next_instance_id += 1
+        contabilidad = self.data_collector.contabilidad
+        for instancia in nuevas:
+            instancia.iniciar()
+            contabilidad.registrar_alta(instancia.id, escalado=escalado)
+        if escalado:
+            contabilidad.registrar_lote(+1)
+        with self.instancias_lock:
+            self.instancias.extend(nuevas)
+            total = len(self.instancias)
+        # Cada nueva instancia libre es un ticket para el despachador.
+        for _ in nuevas:
+            self.instancias_libres_sem.release()
+        logging.info("Manager: %d instancias creadas y añadidas al pool (ids %s). Total: %d.",
+                     len(nuevas), [i.id for i in nuevas], total)
+        return nuevas
+
+    def _destruir_instancias(self, cantidad, escalado=True):
+        """
+        Destruye hasta `cantidad` instancias libres en lote, sin bajar de
+        MIN_SERVERS: se retiran del pool, se les pide detenerse a todas y luego
+        se espera a que terminen. Devuelve cuántas se destruyeron.
+        :param escalado: la decidió el reconciliador (cuenta como lote y churn).
+        """
+        elegidas = []
+        with self.instancias_lock:
+            disponibles = min(cantidad, len(self.instancias) - self.MIN_SERVERS)
+            if disponibles <= 0:
+                logging.warning(
+                    "Manager: intento de desescalado por debajo del minimo (%d instancias). Accion cancelada.",
+                    self.MIN_SERVERS,
+                )
+                return 0
+            for instancia in list(self.instancias):
+                if len(elegidas) == disponibles:
+                    break
+                # Cada instancia libre tiene un ticket en el semáforo: lo consumimos.
+                if instancia.esta_libre() and self.instancias_libres_sem.acquire(blocking=False):
+                    self.instancias.remove(instancia)
+                    elegidas.append(instancia)
 
-        if not self.instancias_libres_sem.acquire(blocking=False):
-            # No hay instancias libres para destruir
+        if not elegidas:
             logging.debug("Manager: no hay instancias libres para destruir en este momento.")
-            return
+            return 0
+        logging.info("Manager: Destruyendo %d instancias por baja carga (ids %s)...",
+                     len(elegidas), [i.id for i in elegidas])
+        for instancia in elegidas:
+            instancia.solicitar_detencion()
+        for instancia in elegidas:
+            instancia.esperar_detencion()
+        contabilidad = self.data_collector.contabilidad
+        for instancia in elegidas:
+            contabilidad.registrar_baja(instancia.id, escalado=escalado)
+        if escalado:
+            contabilidad.registrar_lote(-1)
+        return len(elegidas)
 
-        for instancia in self.instancias:
-            if instancia.esta_libre():
-                logging.info("Manager: Destruyendo instancia %s por baja carga...", instancia.id)
-                instancia.detener()
-                self.instancias.remove(instancia)
-                return
+    def fallar_instancias(self, cantidad):
+        """
+        Simula la caída abrupta de hasta `cantidad` instancias, ocupadas o no.
+        Las peticiones que estaban procesando se pierden y se cuentan como
+        descartadas. El objetivo no cambia, así que el reconciliador repone las
+        instancias caídas (como lo haría un orquestador). Devuelve cuántas cayeron.
+        """
+        with self.instancias_lock:
+            caidas = self.instancias[:cantidad]
+            del self.instancias[:len(caidas)]
+            perdidas = 0
+            for instancia in caidas:
+                if instancia.esta_libre():
+                    # Su ticket en el semáforo ya no corresponde a una instancia libre.
+                    # Si no está es porque el despachador lo tomó y, al no encontrar
+                    # la instancia, lo descartará él mismo.
+                    self.instancias_libres_sem.acquire(blocking=False)
+                else:
+                    perdidas += 1
+                instancia.fallar()
+        contabilidad = self.data_collector.contabilidad
+        for instancia in caidas:
+            contabilidad.registrar_baja(instancia.id, falla=True)
+        with self.cola_lock:
+            self.peticiones_descartadas += perdidas
+        logging.warning("Manager: cayeron %d instancias (ids %s), %d peticiones en curso perdidas.",
+                        len(caidas), [i.id for i in caidas], perdidas)
+        self._reconciliar.set()
+        return len(caidas)
 
-        # Estado inconsistente: devolvemos el ticket del semáforo
-        self.instancias_libres_sem.release()
+    def set_max_servers(self, max_servers):
+        """
+        Cambia el límite superior de instancias. Si hay más instancias que el
+        nuevo límite, el reconciliador destruye las sobrantes a medida que se liberan.
+        """
+        self.max_servers = max(self.MIN_SERVERS, max_servers)
+        self._reconciliar.set()
 
-    def receive_request(self, arrival_time, processing_time):
+    def _instancia_liberada(self):
+        """Callback de las instancias: si sobran instancias, reintenta el desescalado."""
+        if len(self.instancias) > min(self.instancias_objetivo, self.max_servers):
+            self._reconciliar.set()
+
+    def _bucle_reconciliador(self):
+        """
+        Lleva la cantidad de instancias hacia `instancias_objetivo`, acotado en
+        cada pasada a `max_servers`. Las instancias ocupadas no se destruyen: el
+        objetivo se mantiene y el reconciliador vuelve a intentarlo cada vez que
+        una instancia queda libre.
+        """
+        while self._activo.is_set():
+            self._reconciliar.wait()
+            self._reconciliar.clear()
+            if not self._activo.is_set():
+                break
+            with self._objetivo_lock:
+                self.instancias_objetivo = max(self.MIN_SERVERS, min(self.instancias_objetivo, self.max_servers))
+                objetivo = self.instancias_objetivo
+            diferencia = objetivo - len(self.instancias)
+            if diferencia > 0:
+                self._crear_instancias(diferencia)
+            elif diferencia < 0:
+                self._destruir_instancias(-diferencia)
+        logging.info("Reconciliador: detenido.")
+
+    def receive_request(self, arrival_time, processing_time, clase=CLASE_POR_DEFECTO, al_finalizar=None):
+        if clase not in self.colas_por_clase:
+            raise ValueError(f"Clase de peticion desconocida: {clase}")
         logging.info(
-            "<-- Manager: Peticion recibida t=%.2f con tiempo de procesamiento=%.3fs.",
+            "<-- Manager: Peticion %s recibida t=%.2f con tiempo de procesamiento=%.3fs.",
+            clase,
             arrival_time,
             processing_time,
         )
         with self.cola_lock:
-            self.peticiones_pendientes.put((arrival_time, processing_time))
+            self.colas_por_clase[clase].append(Peticion(arrival_time, processing_time, clase, al_finalizar))
+            self.peticiones_recibidas[clase] += 1
         with self._contador_lock:
             self._peticiones_nuevas_contador += 1
         self.peticiones_nuevas_sem.release()
 
     def get_peticiones_pendientes_snapshot(self):
         with self.cola_lock:
-            return list(self.peticiones_pendientes.queue)
+            return [peticion for cola in self.colas_por_clase.values() for peticion in cola]
+
+    def get_contadores_colas(self):
+        """
+        Devuelve ({clase: peticiones en cola}, {clase: peticiones recibidas},
+        peticiones descartadas), tomados juntos y sin copiar las colas.
+        """
+        with self.cola_lock:
+            return (
+                {clase: len(cola) for clase, cola in self.colas_por_clase.items()},
+                dict(self.peticiones_recibidas),
+                self.peticiones_descartadas,
+            )
 
     def get_and_reset_nuevas_peticiones(self):
         with self._contador_lock:
@@ -89,27 +262,135 @@ class SystemManager:
         Vacía la cola de peticiones pendientes al finalizar la simulación.
         """
         with self.cola_lock:
-            num_peticiones_descartadas = self.peticiones_pendientes.qsize()
-            # Accedemos a la estructura de datos subyacente (deque) para limpiarla.
-            self.peticiones_pendientes.queue.clear()
+            num_peticiones_descartadas = sum(len(cola) for cola in self.colas_por_clase.values())
+            for cola in self.colas_por_clase.values():
+                cola.clear()
+            self.peticiones_descartadas += num_peticiones_descartadas
             if num_peticiones_descartadas > 0:
                 logging.info(f"Se limpió la cola. Se descartaron {num_peticiones_descartadas} peticiones pendientes.")
 
+    def exportar_estado(self):
+        """
+        Devuelve el estado serializable del manager para un snapshot: peticiones
+        pendientes por clase, peticiones en curso con su tiempo restante, cantidad
+        de instancias y estado del despachador. Los callbacks `al_finalizar` no se
+        guardan (las conexiones HTTP retenidas no sobreviven a un snapshot).
+        Para que sea coherente con el DataCollector debe llamarse con `corte_lock`
+        tomado (ver Checkpoint.exportar_snapshot).
+        """
+        # Con cola_lock tomado el despachador no puede tener una petición fuera
+        # de la cola y todavía sin asignar.
+        with self.cola_lock, self.instancias_lock:
+            pendientes = {
+                clase: [(p.arrival_time, p.processing_time) for p in cola]
+                for clase, cola in self.colas_por_clase.items()
+            }
+            en_curso = [
+                peticion for peticion in
+                (instancia.get_peticion_en_curso() for instancia in self.instancias)
+                if peticion is not None
+            ]
+            credito = dict(self._credito_por_clase)
+            recibidas = dict(self.peticiones_recibidas)
+            descartadas = self.peticiones_descartadas
+        return {
+            "clases": dict(self.clases),
+            "politica": self.politica,
+            "max_servers": self.max_servers,
+            "num_instancias": len(self.instancias),
+            "next_instance_id": self.next_instance_id,
+            "pendientes": pendientes,
+            "en_curso": en_curso,
+            "credito_por_clase": credito,
+            "peticiones_recibidas": recibidas,
+            "peticiones_descartadas": descartadas,
+        }
+
+    def restaurar_estado(self, estado):
+        """
+        Restaura un estado exportado con `exportar_estado`. Debe llamarse sobre un
+        manager recién creado y sin peticiones. Las peticiones que estaban en curso
+        se encolan al frente de su clase con el tiempo de procesamiento restante.
+        """
+        self.max_servers = estado["max_servers"]
+        self.politica = estado["politica"]
+        self.next_instance_id = max(self.next_instance_id, estado["next_instance_id"])
+        while len(self.instancias) < estado["num_instancias"]:
+            self.create_instance()
+
+        total = 0
+        with self.cola_lock:
+            self._credito_por_clase.update(estado["credito_por_clase"])
+            self.peticiones_recibidas.update(estado.get("peticiones_recibidas", {}))
+            self.peticiones_descartadas = estado.get("peticiones_descartadas", 0)
+            for clase, peticiones in estado["pendientes"].items():
+                for arrival_time, processing_time in peticiones:
+                    self.colas_por_clase[clase].append(Peticion(arrival_time, processing_time, clase))
+                    total += 1
+            for arrival_time, restante, clase in sorted(estado["en_curso"], reverse=True):
+                self.colas_por_clase[clase].appendleft(Peticion(arrival_time, restante, clase))
+                total += 1
+        for _ in range(total):
+            self.peticiones_nuevas_sem.release()
+        logging.info("Manager: estado restaurado (%d instancias, %d peticiones).",
+                     len(self.instancias), total)
+
+    def _elegir_clase(self):
+        """
+        Devuelve la clase de la que se despachará la siguiente petición, o None
+        si no hay peticiones pendientes. Debe llamarse con cola_lock tomado.
+        """
+        clases_con_pendientes = [clase for clase, cola in self.colas_por_clase.items() if cola]
+        if not clases_con_pendientes:
+            return None
+        if self.politica == "estricta":
+            return clases_con_pendientes[0]
+
+        # Round-robin ponderado suave: cada clase acumula su peso como crédito,
+        # se elige la de mayor crédito y se le descuenta la suma de los pesos.
+        peso_total = 0
+        elegida = None
+        for clase in clases_con_pendientes:
+            self._credito_por_clase[clase] += self.clases[clase]
+            peso_total += self.clases[clase]
+            if elegida is None or self._credito_por_clase[clase] > self._credito_por_clase[elegida]:
+                elegida = clase
+        self._credito_por_clase[elegida] -= peso_total
+        return elegida
+
     def _bucle_despachador(self):
         while self._activo.is_set():
             self.peticiones_nuevas_sem.acquire()
-            with self.cola_lock:
-                peticion = self.peticiones_pendientes.get()
-
-            if peticion is None:
+            if not self._activo.is_set():
                 break
 
+            # Esperamos primero una instancia libre y recién entonces elegimos la
+            # petición, para que una petición prioritaria que llegue mientras tanto
+            # pueda adelantarse a las que ya estaban en cola.
             self.instancias_libres_sem.acquire()
-            for instancia in self.instancias:
-                if instancia.esta_libre():
-                    instancia.recibir_peticion(*peticion)
-                    self.peticiones_pendientes.task_done()
-                    break
+            if not self._activo.is_set():
+                break
+
+            # Se saca de la cola y se asigna sin soltar cola_lock, para que un
+            # snapshot nunca vea la petición fuera de la cola y sin instancia.
+            with self.cola_lock:
+                clase = self._elegir_clase()
+                peticion = self.colas_por_clase[clase].popleft() if clase is not None else None
+                if peticion is not None:
+                    with self.instancias_lock:
+                        libre = next((i for i in self.instancias if i.esta_libre()), None)
+                        if libre is not None:
+                            libre.recibir_peticion(*peticion)
+                    if libre is None:
+                        # Estado inconsistente (ticket sin instancia libre): devolvemos la
+                        # petición al frente de su cola para no perderla.
+                        self.colas_por_clase[peticion.clase].appendleft(peticion)
+
+            if peticion is None:
+                # La cola se vació (clear_pending_requests): devolvemos el ticket de la instancia.
+                self.instancias_libres_sem.release()
+            elif libre is None:
+                self.peticiones_nuevas_sem.release()
 
         logging.info("Dispatcher: detenido.")
 
@@ -118,44 +399,36 @@ class SystemManager:
         Ajusta el número de instancias basado en una orden discreta del controlador.
         num_instancias_a_variar > 0  -> crear instancias
         num_instancias_a_variar < 0  -> destruir instancias
+        No bloquea: fija el objetivo y despierta al reconciliador.
         """
         if num_instancias_a_variar == 0:
             return
 
-        if num_instancias_a_variar > 0:
-            actual = len(self.instancias)
-            deseado = min(self.max_servers, actual + num_instancias_a_variar)
-            delta = deseado - actual # Cuántas crear realmente
-            logging.info(
-                "Manager.scale: orden=+%d -> escalando hacia ARRIBA (+%d instancias, de %d a %d).",
-                num_instancias_a_variar,
-                delta,
-                actual,
-                deseado,
-            )
-            for _ in range(delta):
-                self.create_instance()
-        else:
-            delta = abs(num_instancias_a_variar)
-            logging.info(
-                "Manager.scale: orden=%d -> escalando hacia ABAJO (-%d instancias).",
-                num_instancias_a_variar,
-                delta,
-            )
-            for _ in range(delta):
-                self.destroy_instance()
+        actual = len(self.instancias)
+        deseado = max(self.MIN_SERVERS, min(self.max_servers, actual + num_instancias_a_variar))
+        logging.info(
+            "Manager.scale: orden=%+d -> objetivo de %d a %d instancias.",
+            num_instancias_a_variar,
+            actual,
+            deseado,
+        )
+        with self._objetivo_lock:
+            self.instancias_objetivo = deseado
+        self._reconciliar.set()
 
     def detener_instancias(self):
         # Ya no esperamos a que la cola se procese, porque en main.py
         # se llama a clear_pending_requests() justo antes.
-        # logging.info("Manager: Esperando a que se procesen todas las peticiones en cola...")
-        # self.peticiones_pendientes.join()
-        with self.cola_lock:
-            self.peticiones_pendientes.put(None)
-        self.peticiones_nuevas_sem.release()
+        # El despachador puede estar bloqueado en cualquiera de los dos semáforos:
+        # liberamos ambos para que vea la bandera de apagado.
         self._activo.clear()
+        self.peticiones_nuevas_sem.release()
+        self.instancias_libres_sem.release()
+        self._reconciliar.set()
+        self._reconciliador_thread.join()
         self._dispatcher_thread.join()
         logging.info("Manager: Deteniendo instancias de procesamiento...")
         for instancia in list(self.instancias):
             instancia.detener()
+            self.data_collector.contabilidad.registrar_baja(instancia.id, escalado=False)
         logging.info("Manager: todas las instancias detenidas.")
\ No newline at end of file
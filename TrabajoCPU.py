@@ -0,0 +1,65 @@
+import os
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+def trabajo_cpu(iteraciones):
+    """
+    Carga de CPU real: encadena `iteraciones` hashes SHA-256.
+    Se ejecuta en un proceso del pool, por eso es una función de módulo (picklable).
+    """
+    digest = b"simulacion"
+    for _ in range(iteraciones):
+        digest = hashlib.sha256(digest).digest()
+    return digest[:4].hex()
+
+class EjecutorCPU:
+    """
+    Ejecuta el procesamiento de las instancias como trabajo de CPU real en un
+    pool de procesos, en lugar de `time.sleep`.
+
+    El tiempo de procesamiento de cada petición se interpreta como segundos de
+    CPU de un núcleo; se traduce a iteraciones de hashing según una calibración
+    inicial. Como el pool tiene como máximo un proceso por núcleo, escalar por
+    encima de `num_procesos` instancias ya no agrega capacidad real: las
+    peticiones esperan por un núcleo libre y la latencia deja de bajar.
+    """
+
+    def __init__(self, num_procesos=None, iteraciones_por_segundo=None):
+        """
+        :param num_procesos: procesos trabajadores (por defecto, la cantidad de núcleos).
+        :param iteraciones_por_segundo: costo de la carga; si es None se calibra en este equipo.
+        """
+        self.num_procesos = num_procesos or os.cpu_count() or 1
+        self.iteraciones_por_segundo = iteraciones_por_segundo or self.calibrar()
+        self._pool = ProcessPoolExecutor(max_workers=self.num_procesos)
+        logging.info(
+            "EjecutorCPU: %d procesos, %d iteraciones de hash por segundo de CPU.",
+            self.num_procesos,
+            self.iteraciones_por_segundo,
+        )
+
+    @staticmethod
+    def calibrar(duracion_s=0.2):
+        """Mide cuántas iteraciones de `trabajo_cpu` entran en un segundo de CPU."""
+        iteraciones = 1000
+        inicio = time.perf_counter()
+        while True:
+            trabajo_cpu(iteraciones)
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido >= duracion_s:
+                break
+            iteraciones *= 2
+            inicio = time.perf_counter()
+        return max(1, int(iteraciones / transcurrido))
+
+    def procesar(self, tiempo_procesamiento_s):
+        """Ejecuta en el pool el trabajo equivalente a `tiempo_procesamiento_s` y espera el resultado."""
+        iteraciones = int(tiempo_procesamiento_s * self.iteraciones_por_segundo)
+        return self._pool.submit(trabajo_cpu, iteraciones).result()
+
+    def cerrar(self):
+        """Detiene los procesos trabajadores descartando el trabajo pendiente."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        logging.info("EjecutorCPU: detenido.")
@@ -1,13 +1,127 @@
+import os
+import json
 import time
 import logging
+import argparse
 from Cliente import Cliente
 from SystemManager import SystemManager
 from Controlador import Controlador
 from Medidor import Medidor
 from DataCollector import DataCollector
-from Plotter import Plotter
+from Reloj import Reloj
+from Peticion import CLASES_POR_DEFECTO
+import Checkpoint
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulación de sistema web con auto-escalado.")
+    parser.add_argument(
+        "--http", type=int, metavar="PUERTO", default=None,
+        help="Levanta un front end HTTP local en PUERTO para recibir carga externa (wrk, ab...).",
+    )
+    parser.add_argument(
+        "--http-host", default="127.0.0.1",
+        help="Dirección en la que escucha el front end HTTP (por defecto 127.0.0.1).",
+    )
+    parser.add_argument(
+        "--metricas", type=int, metavar="PUERTO", default=None,
+        help="Publica métricas en formato Prometheus en http://<host>:PUERTO/metrics.",
+    )
+    parser.add_argument(
+        "--metricas-host", default="127.0.0.1",
+        help="Dirección en la que escucha el exportador de métricas (por defecto 127.0.0.1).",
+    )
+    parser.add_argument(
+        "--cpu", action="store_true",
+        help="Las instancias ejecutan trabajo de CPU real en un pool de procesos en lugar de dormir.",
+    )
+    parser.add_argument(
+        "--cpu-procesos", type=int, default=None, metavar="N",
+        help="Procesos trabajadores del modo --cpu (por defecto, la cantidad de núcleos).",
+    )
+    parser.add_argument(
+        "--acelerar", type=float, default=1.0, metavar="FACTOR",
+        help="Factor de aceleración del tiempo simulado (ej. 10 o 50). Por defecto 1 (tiempo real).",
+    )
+    parser.add_argument(
+        "--restaurar", metavar="RUTA", default=None,
+        help="Retoma la simulación desde un snapshot guardado con --snapshot.",
+    )
+    parser.add_argument(
+        "--snapshot", metavar="RUTA", default=None,
+        help="Guarda un snapshot del estado completo al cerrar (y periódicamente con --snapshot-cada).",
+    )
+    parser.add_argument(
+        "--snapshot-cada", type=float, default=None, metavar="SEGUNDOS",
+        help="Intervalo (segundos simulados) entre snapshots automáticos en RUTA de --snapshot.",
+    )
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="Corre sin interfaz gráfica (no importa matplotlib) durante --duracion segundos simulados.",
+    )
+    parser.add_argument(
+        "--duracion", type=float, default=None, metavar="SEGUNDOS",
+        help="Duración (segundos simulados) de una corrida --headless. "
+             "Por defecto la del --escenario, o 60.",
+    )
+    parser.add_argument(
+        "--resultados", metavar="RUTA", default=None,
+        help="Archivo .npz con las series y peticiones de la corrida "
+             "(por defecto resultados/corrida_<fecha>.npz).",
+    )
+    parser.add_argument(
+        "--sin-resultados", action="store_true",
+        help="No guarda el archivo de resultados de la corrida.",
+    )
+    parser.add_argument(
+        "--muestreo-adaptativo", action="store_true",
+        help="El Medidor ajusta su frecuencia de muestreo (10 ms a 500 ms) según la dinámica de la carga.",
+    )
+    parser.add_argument(
+        "--setpoint-clase", type=_setpoint_clase, action="append", default=None, metavar="CLASE=MS",
+        help="Controla sólo la latencia de las clases indicadas (repetible), "
+             "ej. --setpoint-clase premium=1000 para proteger el SLO premium durante un ataque.",
+    )
+    parser.add_argument(
+        "--escenario", metavar="RUTA", default=None,
+        help="Escenario en JSON con una línea de tiempo de eventos (DoS, rampas, setpoints, fallas...).",
+    )
+    parser.add_argument(
+        "--config", metavar="RUTA", default=None,
+        help="Configuración del controlador en JSON (ej. la generada por AutoTuning.py).",
+    )
+    return parser.parse_args()
+
+def _setpoint_clase(valor):
+    """Convierte "CLASE=MS" en (clase, ms) para --setpoint-clase."""
+    clase, separador, ms = valor.partition("=")
+    if not separador or clase not in CLASES_POR_DEFECTO:
+        raise argparse.ArgumentTypeError(
+            f"se esperaba CLASE=MS con CLASE en {sorted(CLASES_POR_DEFECTO)}: {valor!r}")
+    try:
+        ms = float(ms)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"latencia inválida: {valor!r}")
+    if not ms > 0:
+        raise argparse.ArgumentTypeError(f"la latencia debe ser positiva: {valor!r}")
+    return clase, ms
+
+def aplicar_config(ruta, controlador, medidor):
+    """Aplica ganancias, banda muerta y frecuencia de muestreo de un JSON de configuración."""
+    with open(ruta, encoding="utf-8") as archivo:
+        config = json.load(archivo)
+    controlador.Kp = config.get("Kp", controlador.Kp)
+    controlador.Kd = config.get("Kd", controlador.Kd)
+    controlador.deadband_s = config.get("deadband_s", controlador.deadband_s)
+    if "frecuencia_muestreo_hz" in config:
+        medidor.intervalo_medicion_s = 1.0 / config["frecuencia_muestreo_hz"]
+    logging.info(
+        "Configuracion %s: Kp=%.3f, Kd=%.3f, banda muerta=%.3fs, muestreo=%.1f Hz.",
+        ruta, controlador.Kp, controlador.Kd, controlador.deadband_s, 1.0 / medidor.intervalo_medicion_s,
+    )
 
 def main():
+    args = parse_args()
+
     # Logging a archivo + consola
     logging.basicConfig(
         level=logging.INFO,
@@ -20,14 +134,25 @@ def main():
     console_handler.setLevel(logging.INFO)
     logging.getLogger('').addHandler(console_handler)
 
-    sim_start_time = time.time()
+    reloj = Reloj(args.acelerar)
+    snapshot = Checkpoint.cargar_snapshot(args.restaurar) if args.restaurar else None
+    # Al restaurar, corremos el inicio hacia atrás para que el tiempo simulado
+    # continúe desde el instante del snapshot.
+    sim_start_time = reloj.time() - (snapshot["t_sim"] if snapshot else 0.0)
 
     # --- Setpoint inicial: 1 segundo ---
     latencia_deseada_s = 1.0
     latencia_deseada_ms = int(latencia_deseada_s * 1000)
 
-    data_collector = DataCollector(sim_start_time)
-    manager = SystemManager(data_collector, max_servers=50)
+    data_collector = DataCollector(sim_start_time, reloj=reloj)
+    ejecutor = None
+    if args.cpu:
+        from TrabajoCPU import EjecutorCPU
+        ejecutor = EjecutorCPU(num_procesos=args.cpu_procesos)
+    # Carga legítima en clase "premium" y tráfico DoS en "estandar",
+    # despachadas con round-robin ponderado (ver Peticion.CLASES_POR_DEFECTO).
+    manager = SystemManager(data_collector, max_servers=50, politica="ponderada",
+                            ejecutor=ejecutor, reloj=reloj)
     controlador = Controlador(manager, Kp=0.8, Kd=7.0, deadband_s=0)
     medidor = Medidor(
         manager,
@@ -36,6 +161,8 @@ def main():
         sim_start_time,
         latencia_deseada_ms=latencia_deseada_ms,
         intervalo_medicion_ms=1000/50,  # Frecuencia de muestreo de 50 Hz
+        reloj=reloj,
+        muestreo_adaptativo=args.muestreo_adaptativo,
     )
 
     # Cliente: base_processing_ms ≈ setpoint para que la latencia estable
@@ -44,25 +171,135 @@ def main():
         manager,
         frecuencia_promedio_hz=1,      # Carga base conservadora (1 petición cada 2 segundos)
         base_processing_ms=latencia_deseada_ms,
+        clase_base="premium",
+        reloj=reloj,
     )
 
-    plotter = Plotter(data_collector, latencia_deseada_s, medidor, cliente)
+    if snapshot is not None:
+        Checkpoint.restaurar_snapshot(snapshot, manager, controlador, medidor, data_collector, cliente)
+    else:
+        # Empezamos con una instancia
+        manager.create_instance()
+
+    # La configuración y los setpoints por clase se aplican después de
+    # restaurar, para poder bifurcar un mismo snapshot con distintos controladores.
+    if args.config:
+        aplicar_config(args.config, controlador, medidor)
+    if args.setpoint_clase:
+        medidor.setpoints_por_clase_s = {
+            **medidor.setpoints_por_clase_s,
+            **{clase: ms / 1000.0 for clase, ms in args.setpoint_clase},
+        }
+        logging.info("Setpoints por clase: %s.", medidor.setpoints_por_clase_s)
+
+    escenario = None
+    if args.escenario:
+        from Escenario import Escenario, cargar_escenario
+        escenario = Escenario(cargar_escenario(args.escenario), cliente, manager, medidor, reloj=reloj,
+                              t_restaurado_s=snapshot["t_sim"] if snapshot else None)
+    duracion_s = args.duracion or (escenario.duracion_s if escenario is not None else 60.0)
+
+    servidor_http = None
+    if args.http is not None:
+        from ServidorHTTP import ServidorHTTP
+        servidor_http = ServidorHTTP(
+            manager, host=args.http_host, puerto=args.http,
+            processing_ms=latencia_deseada_ms,
+        )
 
-    # Empezamos con una instancia
-    manager.create_instance()
+    exportador = None
+    if args.metricas is not None:
+        from ExportadorMetricas import ExportadorMetricas
+        exportador = ExportadorMetricas(
+            data_collector, manager, controlador, host=args.metricas_host, puerto=args.metricas,
+        )
+
+    registro = None
+    if not args.sin_resultados:
+        # numpy sólo se importa si se guardan resultados.
+        from RegistroResultados import RegistroResultados
+        ruta_resultados = args.resultados or os.path.join(
+            "resultados", time.strftime("corrida_%Y%m%d_%H%M%S.npz"))
+        os.makedirs(os.path.dirname(ruta_resultados) or ".", exist_ok=True)
+        registro = RegistroResultados(ruta_resultados, data_collector, meta={
+            "Kp": controlador.Kp,
+            "Kd": controlador.Kd,
+            "deadband_s": controlador.deadband_s,
+            "latencia_deseada_s": medidor.latencia_deseada_s,
+            "setpoints_por_clase_s": medidor.setpoints_por_clase_s,
+            "intervalo_medicion_s": medidor.intervalo_medicion_s,
+            "max_servers": manager.max_servers,
+            "politica": manager.politica,
+            "clases": list(manager.clases),
+            "acelerar": args.acelerar,
+            "restaurado_de": args.restaurar,
+            "escenario": escenario.nombre if escenario is not None else None,
+            "config": args.config,
+        })
+        registro.iniciar()
+
+    guardado_periodico = None
+    if args.snapshot and args.snapshot_cada:
+        guardado_periodico = Checkpoint.GuardadoPeriodico(
+            args.snapshot, args.snapshot_cada, manager, controlador, medidor, data_collector, cliente,
+        )
+        guardado_periodico.iniciar()
 
     # Iniciamos medidor y cliente
     medidor.iniciar()
     cliente.iniciar(sim_start_time)
+    if escenario is not None:
+        escenario.iniciar(sim_start_time)
+    if servidor_http is not None:
+        servidor_http.iniciar()
+    if exportador is not None:
+        exportador.iniciar()
 
-    # UI (bloqueante)
-    plotter.run_animation()
+    if args.headless:
+        # Sin GUI: la corrida dura un tiempo simulado fijo (Ctrl+C la corta antes).
+        try:
+            reloj.sleep(duracion_s)
+        except KeyboardInterrupt:
+            logging.info("Corrida interrumpida por el usuario.")
+    else:
+        # matplotlib (y el backend Tk) sólo se importan si se pide la GUI.
+        from Plotter import Plotter
+        plotter = Plotter(data_collector, medidor.latencia_deseada_s, medidor, cliente)
+        # UI (bloqueante)
+        plotter.run_animation()
 
-    # Cuando se cierra la ventana, apagamos todo ordenadamente
+    # Cuando se cierra la ventana (o termina la corrida), apagamos todo ordenadamente
+    if escenario is not None:
+        escenario.detener()
     cliente.detener()
+    if guardado_periodico is not None:
+        guardado_periodico.detener()
+    if args.snapshot:
+        # Antes de descartar la cola guardamos el estado para poder retomarlo.
+        Checkpoint.guardar_snapshot(args.snapshot, manager, controlador, medidor, data_collector, cliente)
+    costo = data_collector.contabilidad.resumen(por_instancia=True)
+    logging.info(
+        "Costo de la corrida: %.1f instancias-segundo, utilización %.1f%%, %d altas / %d bajas "
+        "en %d lotes (%d reversiones de dirección).",
+        costo["instancia_segundos"], costo["utilizacion_pct"], costo["altas"], costo["bajas"],
+        costo["lotes_escalado"], costo["reversiones"],
+    )
+    if registro is not None:
+        registro.detener(resumen={
+            "t_final_s": reloj.time() - sim_start_time,
+            "peticiones_resueltas": len(data_collector.peticiones_resueltas),
+            "peticiones_pendientes": len(manager.get_peticiones_pendientes_snapshot()),
+            "costo": costo,
+        })
+    if servidor_http is not None:
+        servidor_http.detener()
     manager.clear_pending_requests() # Limpiamos la cola de peticiones
     manager.detener_instancias()
     medidor.detener()
+    if exportador is not None:
+        exportador.detener()
+    if ejecutor is not None:
+        ejecutor.cerrar()
     logging.info("Programa finalizado.")
 
 if __name__ == "__main__":